@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -33,16 +34,134 @@ def create_app(_config_name=None):
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_host=1)
 
     from app.models import User
-
-    @login.user_loader
-    def load_user(user_id):
-        return db.session.get(User, int(user_id))
+    from app.bookings import index as booking_index
+    from app.bookings import usage as booking_usage
+    from app.bookings import locks as booking_locks
+    booking_index.init_app(app)
+    booking_locks.init_app(app)
+
+    from app.audit import sink as audit_sink
+    from app.audit import retention as audit_retention
+    audit_sink.init_app(app)
+    audit_retention.init_app(app)
+
+    from app.main import stats as dashboard_stats
+    dashboard_stats.init_app(app)
+
+    from app.environment import catalog as environment_catalog
+    environment_catalog.init_app(app)
+
+    from app.monitoring import metrics as request_metrics
+    from app.monitoring import diagnostics as query_diagnostics
+    from app.monitoring import profiler as request_profiler
+    from app.monitoring import registry as metrics_registry
+    request_metrics.init_app(app)
+    metrics_registry.init_app(app)
+    query_diagnostics.init_app(app)
+    request_profiler.init_app(app)
+
+    from app.auth import cache as user_cache
+    user_cache.init_app(app)
+    login.user_loader(user_cache.load_user)
 
     @app.cli.command("init-db")
     def init_db():
         db.create_all()
         print("Initialized the database.")
 
+    @app.cli.command("rebuild-usage")
+    def rebuild_usage():
+        rows = booking_usage.rebuild()
+        print(f"Rebuilt daily usage rollup ({rows} rows).")
+
+    @app.cli.command("backfill-audit")
+    def backfill_audit():
+        from app.audit import backfill
+        added = backfill.ensure_columns()
+        if added:
+            print(f"Added audit_log columns: {', '.join(added)}")
+        print(f"Backfilled {backfill.backfill()} audit entries.")
+
+    @app.cli.command("db-indexes")
+    @click.option("--explain/--no-explain", default=True,
+                  help="Print the query plans of the hot queries.")
+    def db_indexes(explain):
+        from app import indexes
+        created = indexes.ensure_indexes()
+        print(f"Created indexes: {', '.join(created)}" if created else "All indexes present.")
+        if explain:
+            for label, plan in indexes.explain_hot_queries():
+                print(f"\n{label}:")
+                for row in plan:
+                    print("  " + " | ".join("" if v is None else str(v) for v in row))
+
+    @app.cli.command("export-audit")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv")
+    @click.option("--output", "-o", default="-", help="File to write (default: stdout).")
+    @click.option("--gzip", "gzip", is_flag=True, help="Compress the output.")
+    @click.option("--since", type=click.DateTime(), help="Only entries at/after this time.")
+    @click.option("--until", type=click.DateTime(), help="Only entries before this time.")
+    @click.option("--action", help="Only this action.")
+    @click.option("--actor", type=int, help="Only this actor id.")
+    @click.option("--archived", is_flag=True, help="Include archived entries.")
+    def export_audit(fmt, output, gzip, since, until, action, actor, archived):
+        from app.audit import export
+        chunks = export.stream(fmt, gzip, since=since, until=until,
+                               action=action, actor_id=actor,
+                               archive_dir=app.config["AUDIT_ARCHIVE_DIR"] if archived else None)
+        with click.open_file(output, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk if gzip else chunk.encode("utf-8"))
+
+    @app.cli.command("archive-audit")
+    @click.option("--days", type=int, help="Retention age (default: AUDIT_RETENTION_DAYS).")
+    def archive_audit(days):
+        from app.audit import retention
+        count = retention.run_retention(
+            app.config["AUDIT_ARCHIVE_DIR"],
+            days or app.config["AUDIT_RETENTION_DAYS"],
+            app.config["AUDIT_ARCHIVE_BATCH_SIZE"],
+        )
+        if count is None:
+            raise click.ClickException("Another process is archiving audit entries; try again later.")
+        print(f"Archived {count} audit entries.")
+
+    @app.cli.command("set-role")
+    @click.argument("email")
+    @click.argument("role", type=click.Choice(["regular", "admin"]))
+    def set_role(email, role):
+        from app.auth.service import AuthService
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            raise click.ClickException(f"No user with email {email}")
+        AuthService.set_role(user, role)
+        print(f"{email} is now {role}.")
+
+    @app.cli.command("utilization-report")
+    @click.option("--since", type=click.DateTime(), help="Start (default: 12 weeks ago).")
+    @click.option("--until", type=click.DateTime(), help="End (default: now).")
+    @click.option("--json", "as_json", is_flag=True, help="Print the full report as JSON.")
+    def utilization_report_cmd(since, until, as_json):
+        import json
+        from datetime import datetime, timedelta
+        from app.analytics.heatmap import utilization_report
+        until = until or datetime.utcnow()
+        report = utilization_report(since or until - timedelta(weeks=12), until)
+        if as_json:
+            print(json.dumps(report, default=str, indent=2))
+            return
+        print(f"Utilization {report['since']:%Y-%m-%d %H:%M} – {report['until']:%Y-%m-%d %H:%M}"
+              f" ({report['hours']} h)")
+        print(f"{'Environment':<30} {'Squad':<20} {'Booked h':>9} {'Util':>6} {'p50':>5} {'p95':>5} Peak")
+        for env in report["environments"]:
+            day, hour = divmod(env["peak_hour_of_week"], 24)
+            print(f"{env['name']:<30} {env['owner_squad']:<20} {env['booked_hours']:>9.1f}"
+                  f" {env['utilization']:>6.1%} {env['percentiles']['p50']:>5.0%}"
+                  f" {env['percentiles']['p95']:>5.0%} {'MonTueWedThuFriSatSun'[day*3:day*3+3]} {hour:02d}:00")
+        for squad in report["squads"]:
+            print(f"squad {squad['squad']}: {squad['environments']} env(s),"
+                  f" {squad['booked_hours']:.1f} h booked, {squad['utilization']:.1%}")
+
     @app.cli.command("drop-db")
     def drop_db():
         db.drop_all()
@@ -53,12 +172,16 @@ def create_app(_config_name=None):
     from app.environment.routes import env_bp
     from app.bookings.routes    import bookings_bp
     from app.audit.routes       import audit_bp
+    from app.analytics.routes   import analytics_bp
+    from app.monitoring.routes  import monitoring_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(env_bp)
     app.register_blueprint(bookings_bp)
     app.register_blueprint(audit_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(monitoring_bp)
 
     logging.basicConfig(
         level=logging.INFO if cfg_key == "production" else logging.DEBUG,
@@ -0,0 +1,141 @@
+"""
+Utilization analytics over a date range, computed on NumPy arrays.
+
+All bookings overlapping the range are bulk-loaded by one query into arrays
+of environment index and start/end epoch seconds. They are binned into an
+environment × hour occupancy matrix (booked seconds per hourly slot) with
+``np.bincount``: a booking adds its partial first and last hour directly and
+its full hours through a difference array that is summed along each row.
+Every report (hour-of-week heatmap, percentiles of hourly utilization, squad
+totals) is a reduction of that matrix.
+
+Overlapping (forced) bookings count twice, so an hour can exceed 100%.
+"""
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Booking
+from app.environment.catalog import environment_catalog
+
+logger = logging.getLogger(__name__)
+
+SLOT = 3600  # seconds per bin
+HOURS_PER_WEEK = 7 * 24
+PERCENTILES = (50, 90, 95, 99)
+# 1970-01-01 was a Thursday; shifts epoch hours so that 0 is Monday 00:00
+_EPOCH_WEEKDAY_OFFSET = 3 * 24
+
+
+def _epoch(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds())
+
+
+def load_bookings(since, until, env_ids):
+    """``(env_index, start, end)`` int64 arrays, clipped to [since, until)."""
+    index_of = {env_id: i for i, env_id in enumerate(env_ids)}
+    rows = db.session.execute(
+        select(Booking.environment_id, Booking.start, Booking.end)
+        .where(Booking.end > since, Booking.start < until)
+    ).all()
+    rows = [r for r in rows if r[0] in index_of]
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    env_idx = np.fromiter((index_of[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+    starts = np.array([r[1] for r in rows], dtype="datetime64[s]").astype(np.int64)
+    ends = np.array([r[2] for r in rows], dtype="datetime64[s]").astype(np.int64)
+    lo, hi = _epoch(since), _epoch(until)
+    return env_idx, np.clip(starts, lo, hi), np.clip(ends, lo, hi)
+
+
+def occupancy_matrix(env_idx, starts, ends, n_envs, origin, n_slots):
+    """Booked seconds per (environment, slot); slot k covers origin + k*SLOT."""
+    size = n_envs * n_slots
+    if size == 0:
+        return np.zeros((n_envs, n_slots))
+    keep = ends > starts
+    env_idx, starts, ends = env_idx[keep], starts[keep] - origin, ends[keep] - origin
+    first = starts // SLOT
+    last = (ends - 1) // SLOT
+    row = env_idx * n_slots
+    same = first == last
+
+    occ = np.zeros(size)
+    occ += np.bincount(row[same] + first[same], weights=(ends - starts)[same], minlength=size)
+    multi = ~same
+    occ += np.bincount(row[multi] + first[multi],
+                       weights=((first + 1) * SLOT - starts)[multi], minlength=size)
+    occ += np.bincount(row[multi] + last[multi],
+                       weights=(ends - last * SLOT)[multi], minlength=size)
+
+    # full hours strictly between first and last: +SLOT from first+1 up to last
+    full = multi & (last > first + 1)
+    diff = np.bincount(row[full] + first[full] + 1, minlength=size).astype(float)
+    diff -= np.bincount(row[full] + last[full], minlength=size)
+    occ += np.cumsum(diff.reshape(n_envs, n_slots), axis=1).ravel() * SLOT
+    return occ.reshape(n_envs, n_slots)
+
+
+def utilization_report(since, until):
+    """
+    Capacity report for [since, until) (whole hours). Returns a dict with the
+    per-environment hour-of-week heatmap (7 × 24, Monday first), percentiles
+    of hourly utilization and booked hours, plus per-squad totals.
+    """
+    since = since.replace(minute=0, second=0, microsecond=0)
+    n_slots = max(int((until - since).total_seconds() // SLOT), 0)
+    until = since + timedelta(seconds=n_slots * SLOT)
+    envs = environment_catalog().environments
+    env_ids = [e.id for e in envs]
+
+    env_idx, starts, ends = load_bookings(since, until, env_ids)
+    origin = _epoch(since)
+    util = occupancy_matrix(env_idx, starts, ends, len(envs), origin, n_slots) / SLOT
+
+    # average utilization per hour of week
+    how = (np.arange(n_slots) + origin // SLOT + _EPOCH_WEEKDAY_OFFSET) % HOURS_PER_WEEK
+    slots_per_how = np.bincount(how, minlength=HOURS_PER_WEEK)
+    cells = (np.arange(len(envs))[:, None] * HOURS_PER_WEEK + how).ravel()
+    heat = np.bincount(cells, weights=util.ravel(), minlength=len(envs) * HOURS_PER_WEEK)
+    heat = heat.reshape(len(envs), HOURS_PER_WEEK)
+    heat = np.divide(heat, slots_per_how, out=np.zeros_like(heat), where=slots_per_how > 0)
+
+    pct = (np.percentile(util, PERCENTILES, axis=1).T if n_slots
+           else np.zeros((len(envs), len(PERCENTILES))))
+    booked_hours = util.sum(axis=1)
+
+    environments = []
+    for i, env in enumerate(envs):
+        environments.append({
+            "id": env.id,
+            "name": env.name,
+            "owner_squad": env.owner_squad,
+            "booked_hours": round(float(booked_hours[i]), 2),
+            "utilization": round(float(booked_hours[i] / n_slots), 4) if n_slots else 0.0,
+            "percentiles": {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, pct[i])},
+            "peak_hour_of_week": int(heat[i].argmax()),
+            "heatmap": np.round(heat[i].reshape(7, 24), 4).tolist(),
+        })
+
+    squads = {}
+    for env in environments:
+        squad = squads.setdefault(env["owner_squad"], {"squad": env["owner_squad"],
+                                                       "environments": 0, "booked_hours": 0.0})
+        squad["environments"] += 1
+        squad["booked_hours"] += env["booked_hours"]
+    for squad in squads.values():
+        squad["booked_hours"] = round(squad["booked_hours"], 2)
+        capacity = squad["environments"] * n_slots
+        squad["utilization"] = round(squad["booked_hours"] / capacity, 4) if capacity else 0.0
+
+    logger.info("Utilization report %s–%s: %d bookings, %d envs, %d slots",
+                since, until, len(starts), len(envs), n_slots)
+    return {
+        "since": since,
+        "until": until,
+        "hours": n_slots,
+        "environments": environments,
+        "squads": sorted(squads.values(), key=lambda s: s["squad"]),
+    }
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, abort, jsonify, render_template, request
+from flask_login import login_required
+from app.auth.decorators import admin_required
+from app.analytics.heatmap import PERCENTILES, utilization_report
+
+analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
+
+DEFAULT_RANGE = timedelta(weeks=12)
+MAX_RANGE = timedelta(days=366)
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _range_args():
+    """``since``/``until`` from the query string; defaults to the last 12 weeks."""
+    try:
+        until = datetime.fromisoformat(request.args["until"]) if request.args.get("until") \
+            else datetime.utcnow()
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") \
+            else until - DEFAULT_RANGE
+    except ValueError:
+        abort(400, description="since and until must be ISO dates.")
+    if not since < until <= since + MAX_RANGE:
+        abort(400, description="The range must be non-empty and at most a year.")
+    return since, until
+
+
+@analytics_bp.route("/utilization")
+@login_required
+@admin_required
+def utilization():
+    """Hour-of-week heatmaps, percentiles and squad totals for capacity planning."""
+    since, until = _range_args()
+    report = utilization_report(since, until)
+    selected = request.args.get("env", type=int)
+    env = next((e for e in report["environments"] if e["id"] == selected), None) \
+        or (report["environments"][0] if report["environments"] else None)
+    return render_template(
+        "analytics/utilization.html",
+        report=report,
+        env=env,
+        weekdays=WEEKDAYS,
+        percentiles=PERCENTILES,
+    )
+
+
+@analytics_bp.route("/utilization.json")
+@login_required
+@admin_required
+def utilization_json():
+    since, until = _range_args()
+    report = utilization_report(since, until)
+    report["since"] = report["since"].isoformat()
+    report["until"] = report["until"].isoformat()
+    return jsonify(report)
@@ -0,0 +1,114 @@
+"""
+One-off upgrade of ``audit_log`` to the structured columns.
+
+``ensure_columns`` adds any structured column (and index) missing from an
+existing database; ``backfill`` parses the free-text ``details`` of older
+entries into those columns. Booking entries whose text was fully parsed have
+their ``details`` reduced to what the rendered message cannot reproduce.
+"""
+import logging
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import db
+from app.models import AuditLog, Environment
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_COLUMNS = ("booking_id", "environment_id", "environment_name", "start", "end", "forced")
+
+_BOOKING_RE = re.compile(r"booking #(\d+) in env “(.+?)”")
+_SPAN_RE = re.compile(r"from (\d{4}-\d\d-\d\d \d\d:\d\d) to (\d{4}-\d\d-\d\d \d\d:\d\d)")
+_EDIT_RE = re.compile(
+    r"from (\d{4}-\d\d-\d\d \d\d:\d\d)–(\d{4}-\d\d-\d\d \d\d:\d\d) to "
+    r"(\d{4}-\d\d-\d\d \d\d:\d\d)–(\d{4}-\d\d-\d\d \d\d:\d\d)"
+)
+_ENV_ID_RE = re.compile(r"\(ID (\d+)\)")
+_ENV_NAME_RE = re.compile(r"env(?:ironment)? “(.+?)”")
+
+
+def _ts(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+
+def ensure_columns():
+    """Add missing structured columns and indexes; returns the columns added."""
+    table = AuditLog.__table__
+    existing = {c["name"] for c in inspect(db.engine).get_columns(table.name)}
+    added = []
+    with db.engine.begin() as conn:
+        for name in STRUCTURED_COLUMNS:
+            if name in existing:
+                continue
+            col = table.c[name]
+            ddl = (f"ALTER TABLE {table.name} ADD COLUMN "
+                   f"{conn.dialect.identifier_preparer.quote(name)} "
+                   f"{col.type.compile(dialect=conn.dialect)}")
+            if name == "forced":
+                ddl += " NOT NULL DEFAULT 0"
+            conn.execute(text(ddl))
+            added.append(name)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    return added
+
+
+def parse_details(action, details, env_ids_by_name):
+    """Structured fields recoverable from one entry's text, plus leftover details."""
+    fields = {"forced": action.startswith("forced")}
+    leftover = details
+
+    booking = _BOOKING_RE.search(details)
+    if booking:
+        fields["booking_id"] = int(booking.group(1))
+        fields["environment_id"] = env_ids_by_name.get(booking.group(2))
+        fields["environment_name"] = booking.group(2)
+        edit = _EDIT_RE.search(details)
+        span = _SPAN_RE.search(details)
+        if edit:
+            fields["start"], fields["end"] = _ts(edit.group(3)), _ts(edit.group(4))
+            leftover = f"previously {edit.group(1)}–{edit.group(2)}"
+        elif span:
+            fields["start"], fields["end"] = _ts(span.group(1)), _ts(span.group(2))
+            leftover = None
+        if fields["environment_id"] is None or "start" not in fields:
+            leftover = details  # keep the original text if anything is missing
+        return fields, leftover
+
+    env_id = _ENV_ID_RE.search(details)
+    env_name = _ENV_NAME_RE.search(details)
+    if env_id:
+        fields["environment_id"] = int(env_id.group(1))
+    elif env_name:
+        fields["environment_id"] = env_ids_by_name.get(env_name.group(1))
+    if env_name:
+        fields["environment_name"] = env_name.group(1)
+    return fields, leftover
+
+
+def backfill(batch_size=1000):
+    """Fill structured columns from ``details``; returns the number of rows updated."""
+    env_ids_by_name = dict(db.session.query(Environment.name, Environment.id))
+    updated, last_id = 0, 0
+    while True:
+        batch = (
+            AuditLog.query
+            .filter(AuditLog.id > last_id,
+                    AuditLog.details.isnot(None),
+                    AuditLog.booking_id.is_(None),
+                    AuditLog.environment_id.is_(None))
+            .order_by(AuditLog.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for entry in batch:
+            fields, entry.details = parse_details(entry.action, entry.details, env_ids_by_name)
+            for name, value in fields.items():
+                setattr(entry, name, value)
+            updated += 1
+        last_id = batch[-1].id
+        db.session.commit()
+        logger.info("Backfilled audit entries up to id %s", last_id)
+    return updated
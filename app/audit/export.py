@@ -0,0 +1,104 @@
+"""
+Streaming export of ``audit_log`` as CSV or NDJSON.
+
+Rows are read with ``yield_per`` (a server-side cursor on MySQL) and written
+out one chunk at a time by generators, so memory use does not depend on how
+many rows are exported. Output can be gzip-compressed on the fly.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from sqlalchemy import func, select
+from app import db
+from app.models import AuditLog, Environment, User
+
+FIELDS = [
+    "id", "timestamp", "action", "actor_id", "actor_email", "booking_id",
+    "environment_id", "environment_name", "start", "end", "forced", "details", "message",
+]
+FORMATS = {
+    "csv":    "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_entries(since=None, until=None, action=None, actor_id=None,
+                 limit=None, chunk_size=1000):
+    """Yield audit entries as dicts in id order, ``chunk_size`` rows per fetch."""
+    stmt = (
+        select(AuditLog.id, AuditLog.timestamp, AuditLog.action, AuditLog.actor_id,
+               User.email.label("actor_email"), AuditLog.booking_id,
+               AuditLog.environment_id,
+               func.coalesce(AuditLog.environment_name, Environment.name).label("environment_name"),
+               AuditLog.start, AuditLog.end, AuditLog.forced, AuditLog.details)
+        .outerjoin(User, User.id == AuditLog.actor_id)
+        .outerjoin(Environment, Environment.id == AuditLog.environment_id)
+        .order_by(AuditLog.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if since:
+        stmt = stmt.where(AuditLog.timestamp >= since)
+    if until:
+        stmt = stmt.where(AuditLog.timestamp < until)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if actor_id:
+        stmt = stmt.where(AuditLog.actor_id == actor_id)
+    if limit:
+        stmt = stmt.limit(limit)
+
+    for row in db.session.execute(stmt):
+        entry = row._asdict()
+        entry["message"] = AuditLog.render_message(
+            row.action, row.details, row.booking_id, row.environment_id,
+            row.environment_name, row.start, row.end,
+        )
+        yield entry
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def to_csv(entries):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for entry in entries:
+        writer.writerow({k: _iso(v) for k, v in entry.items()})
+        if buf.tell() > 64 * 1024:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def to_ndjson(entries):
+    for entry in entries:
+        yield json.dumps({k: _iso(entry.get(k)) for k in FIELDS}, ensure_ascii=False) + "\n"
+
+
+def gzipped(chunks):
+    """Compress a stream of text chunks into gzip bytes on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # 31 → gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(fmt="csv", gzip=False, archive_dir=None, **filters):
+    """
+    Generator of the encoded export (str chunks, or bytes when gzipped).
+    With ``archive_dir`` the matching archived entries are streamed first.
+    """
+    writer = to_ndjson if fmt == "ndjson" else to_csv
+    entries = iter_entries(**filters)
+    if archive_dir:
+        from app.audit.retention import search_archives
+        entries = itertools.chain(search_archives(archive_dir, **filters), entries)
+    chunks = writer(entries)
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,204 @@
+"""
+Audit-log retention: move old entries into compressed monthly archives.
+
+``archive_old_entries`` copies entries older than the retention age into one
+compressed NDJSON file per month, ``audit-YYYY-MM.ndjson.gz``, and deletes
+them, one bounded batch per transaction so the table is never locked for long.
+
+Each batch first lands in a part file per month it covers,
+``audit-YYYY-MM-<first id>.ndjson.gz``, written to a temporary name, fsynced
+and renamed into place before the rows are deleted. At the end of the run the
+parts are compacted into their month's file: its existing gzip members and
+the parts' members are concatenated (a valid multi-member gzip, nothing is
+recompressed) into a temporary file that replaces it, and only then are the
+parts removed. An interrupted run therefore leaves complete files only; the
+next run compacts leftover parts before writing new ones, and
+``search_archives`` reads parts too and skips repeated entries.
+
+With ``AUDIT_RETENTION_ENABLED`` every process schedules the job on an
+APScheduler interval, but a run only proceeds under the ``audit-retention``
+job lease (see ``app.leases``), renewed before every batch, so one process
+archives at a time however long the run takes.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from app import db, leases
+from app.models import AuditLog
+from app.audit.export import iter_entries, to_ndjson
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "audit-retention"
+LEASE_DURATION = timedelta(hours=1)
+
+
+_PART_RE = re.compile(r"^audit-(\d{4}-\d{2})-\d+\.ndjson\.gz$")
+
+
+def _month_path(archive_dir, month):
+    return os.path.join(archive_dir, f"audit-{month}.ndjson.gz")
+
+
+def _part_path(archive_dir, month, first_id):
+    return os.path.join(archive_dir, f"audit-{month}-{first_id:010d}.ndjson.gz")
+
+
+def _fsync_dir(path):
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _replace_durably(path, write):
+    """Atomically replace ``path`` with what ``write(fileobj)`` writes."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as raw:
+        write(raw)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def _write_part(path, entries):
+    def write(raw):
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for line in to_ndjson(entries):
+                gz.write(line.encode("utf-8"))
+    _replace_durably(path, write)
+
+
+def _concatenate(sources):
+    def write(raw):
+        for source in sources:
+            with open(source, "rb") as fh:
+                shutil.copyfileobj(fh, raw)
+    return write
+
+
+def compact_archives(archive_dir):
+    """Fold every part file into its month's archive; returns the months touched."""
+    parts = defaultdict(list)
+    for name in sorted(os.listdir(archive_dir)):
+        match = _PART_RE.match(name)
+        if match:
+            parts[match.group(1)].append(os.path.join(archive_dir, name))
+    for month, paths in parts.items():
+        target = _month_path(archive_dir, month)
+        sources = [target, *paths] if os.path.exists(target) else paths
+        _replace_durably(target, _concatenate(sources))
+        for path in paths:
+            os.remove(path)
+        _fsync_dir(archive_dir)
+    return sorted(parts)
+
+
+def archive_old_entries(archive_dir, max_age_days, batch_size=1000, now=None,
+                        keep_going=None):
+    """Archive and delete entries older than ``max_age_days``; returns the count.
+
+    ``keep_going`` is called before every batch; the run stops early when it
+    returns False (e.g. the job lease could not be renewed).
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=max_age_days)
+    os.makedirs(archive_dir, exist_ok=True)
+    # parts left by an interrupted run first, so no new part can reuse their name
+    compact_archives(archive_dir)
+    archived = 0
+    while True:
+        if keep_going is not None and not keep_going():
+            logger.warning("Audit archiving stopped after %d entries: lease lost", archived)
+            break
+        batch = list(iter_entries(until=cutoff, limit=batch_size))
+        if not batch:
+            break
+        by_month = defaultdict(list)
+        for entry in batch:
+            by_month[f"{entry['timestamp']:%Y-%m}"].append(entry)
+        for month, entries in by_month.items():
+            _write_part(_part_path(archive_dir, month, entries[0]["id"]), entries)
+
+        db.session.execute(delete(AuditLog).where(AuditLog.id.in_([e["id"] for e in batch])))
+        db.session.commit()
+        archived += len(batch)
+        logger.info("Archived %d audit entries (up to id %s)", len(batch), batch[-1]["id"])
+    compact_archives(archive_dir)
+    return archived
+
+
+def _archive_month(path):
+    return os.path.basename(path)[len("audit-"):len("audit-YYYY-MM")]
+
+
+def search_archives(archive_dir, since=None, until=None, action=None, actor_id=None):
+    """Yield archived entries (as exported dicts) matching the filters, oldest first."""
+    seen, seen_month = set(), None
+    # each month's file, then any parts an interrupted run left behind
+    paths = sorted(glob.glob(os.path.join(archive_dir, "audit-*.ndjson.gz")),
+                   key=lambda p: (_archive_month(p), bool(_PART_RE.match(os.path.basename(p))), p))
+    for path in paths:
+        month = _archive_month(path)
+        month_start = datetime.strptime(month, "%Y-%m")
+        if until and month_start >= until:
+            continue
+        if since and (month_start + timedelta(days=32)).replace(day=1) <= since:
+            continue
+        if month != seen_month:
+            seen, seen_month = set(), month
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                entry = json.loads(line)
+                ts = datetime.fromisoformat(entry["timestamp"])
+                key = (entry["id"], entry["timestamp"])  # SQLite may reuse ids of deleted rows
+                if key in seen \
+                        or (since and ts < since) or (until and ts >= until) \
+                        or (action and entry["action"] != action) \
+                        or (actor_id and entry["actor_id"] != actor_id):
+                    continue
+                seen.add(key)
+                yield entry
+
+
+def run_retention(archive_dir, max_age_days, batch_size=1000):
+    """``archive_old_entries`` under the job lease; None if another process holds it."""
+    with leases.lease(LEASE_NAME, LEASE_DURATION) as held:
+        if not held:
+            logger.info("Audit retention already running elsewhere; skipped")
+            return None
+        return archive_old_entries(
+            archive_dir, max_age_days, batch_size,
+            keep_going=lambda: leases.renew(LEASE_NAME, LEASE_DURATION),
+        )
+
+
+def init_app(app):
+    if not app.config.get("AUDIT_RETENTION_ENABLED"):
+        return
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    def run():
+        with app.app_context():
+            run_retention(
+                app.config["AUDIT_ARCHIVE_DIR"],
+                app.config["AUDIT_RETENTION_DAYS"],
+                app.config.get("AUDIT_ARCHIVE_BATCH_SIZE", 1000),
+            )
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(run, "interval", id="audit-retention",
+                      hours=app.config.get("AUDIT_RETENTION_INTERVAL_HOURS", 24),
+                      max_instances=1, coalesce=True)
+    scheduler.start()
+    app.extensions["audit_scheduler"] = scheduler
+    logger.info("Audit retention scheduled: keep %s days", app.config["AUDIT_RETENTION_DAYS"])
@@ -1,10 +1,21 @@
-from flask import Blueprint, render_template, request, abort
+import base64
+from datetime import datetime
+from flask import (
+    Blueprint, Response, current_app, render_template, request, abort, jsonify, url_for,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
+from sqlalchemy import tuple_
 from sqlalchemy.orm import joinedload
+from app.auth.decorators import admin_required
+from app.audit import export
 from app.models import AuditLog
 
 audit_bp = Blueprint('audit', __name__, url_prefix='/audit')
 
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 ACTION_LABELS = {
     "create_booking":       "Created booking",
     "accept_suggestion":    "Created suggested booking",
@@ -21,25 +32,127 @@ ACTION_LABELS = {
     "delete_environment":   "Deleted environment",
 }
 
-@audit_bp.route("/", methods=["GET"])
-@login_required
-def list_audit():
 
-    action = request.args.get("action", type=str)
+def encode_cursor(entry):
+    """Opaque cursor pointing just past ``entry`` in (timestamp, id) order."""
+    raw = f"{entry.timestamp.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        ts, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(entry_id)
+    except ValueError:
+        abort(400, description="Invalid cursor.")
+
 
+def audit_page(actor_id, action=None, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of an actor's audit entries, newest first, using keyset
+    pagination on (timestamp, id). Returns ``(entries, next_cursor)``.
+    """
     q = (
         AuditLog.query
-        .options(joinedload(AuditLog.actor))
-        .filter(AuditLog.actor_id == current_user.id)
-        .order_by(AuditLog.timestamp.desc())
+        .options(joinedload(AuditLog.environment))
+        .filter(AuditLog.actor_id == actor_id)
+        .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
     )
     if action:
         q = q.filter(AuditLog.action == action)
+    if cursor:
+        q = q.filter(tuple_(AuditLog.timestamp, AuditLog.id) < decode_cursor(cursor))
 
-    logs = q.all()
+    entries = q.limit(limit + 1).all()
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def _page_args():
+    limit = min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return request.args.get("action", type=str), request.args.get("cursor"), limit
+
+
+@audit_bp.route("/", methods=["GET"])
+@login_required
+def list_audit():
+
+    action, cursor, limit = _page_args()
+    logs, next_cursor = audit_page(current_user.id, action, cursor, limit)
 
     return render_template(
         "audit/list.html",
         logs=logs,
-        action_labels=ACTION_LABELS
+        action_labels=ACTION_LABELS,
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+@audit_bp.route("/api", methods=["GET"])
+@login_required
+def list_audit_json():
+    """The same page as ``list_audit``, as JSON."""
+    action, cursor, limit = _page_args()
+    logs, next_cursor = audit_page(current_user.id, action, cursor, limit)
+
+    return jsonify({
+        "entries": [
+            {
+                "id": e.id,
+                "timestamp": e.timestamp.isoformat(),
+                "action": e.action,
+                "label": ACTION_LABELS.get(e.action, e.action),
+                "message": e.message,
+                "booking_id": e.booking_id,
+                "environment_id": e.environment_id,
+                "start": e.start.isoformat() if e.start else None,
+                "end": e.end.isoformat() if e.end else None,
+                "forced": e.forced,
+            }
+            for e in logs
+        ],
+        "next_cursor": next_cursor,
+        "next": url_for("audit.list_audit_json", action=action, cursor=next_cursor,
+                        limit=limit) if next_cursor else None,
+    })
+
+
+def _datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"Invalid {name} timestamp.")
+
+
+@audit_bp.route("/export", methods=["GET"])
+@login_required
+@admin_required
+def export_audit():
+    """
+    Stream the full audit log (optionally filtered) as CSV or NDJSON;
+    ``archived=1`` includes entries moved to the retention archives.
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in export.FORMATS:
+        abort(400, description="Unsupported export format.")
+    gzip = request.args.get("gzip") in ("1", "true")
+    archived = request.args.get("archived") in ("1", "true")
+    chunks = export.stream(
+        fmt, gzip,
+        archive_dir=current_app.config["AUDIT_ARCHIVE_DIR"] if archived else None,
+        since=_datetime_arg("since"),
+        until=_datetime_arg("until"),
+        action=request.args.get("action"),
+        actor_id=request.args.get("actor", type=int),
+    )
+
+    filename = f"audit-log.{fmt}" + (".gz" if gzip else "")
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/gzip" if gzip else export.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
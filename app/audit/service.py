@@ -0,0 +1,69 @@
+import json
+import logging
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import insert
+from app import db
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditService:
+
+    @staticmethod
+    def _sink():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get("audit_sink")
+
+    @staticmethod
+    def _row(action, actor_id, details=None, booking_id=None, environment_id=None,
+             environment_name=None, start=None, end=None, forced=False):
+        if isinstance(details, dict):
+            details = json.dumps(details, default=str)
+        else:
+            details = str(details) if details is not None else None
+        return {"action": action, "actor_id": actor_id,
+                "timestamp": datetime.utcnow(), "details": details,
+                "booking_id": booking_id, "environment_id": environment_id,
+                "environment_name": environment_name, "start": start, "end": end, "forced": forced}
+
+    @classmethod
+    def record(cls, action, actor_id, details=None, commit=True, **fields):
+        """
+        Record an AuditLog entry:
+          - dict → JSON‐dumped
+          - anything else → str()
+        ``fields`` fill the structured columns (booking_id, environment_id,
+        start, end, forced); the readable text is rendered from them on demand.
+        With the async sink enabled (and room in its queue) the row is handed
+        to the sink when the current transaction commits instead of being
+        added to it; ``commit`` still commits the session.
+        """
+        row = cls._row(action, actor_id, details, **fields)
+        sink = cls._sink()
+        if sink is not None and sink.has_room():
+            sink.defer(db.session(), [row])
+        else:
+            db.session.add(AuditLog(**row))
+        if commit:
+            db.session.commit()
+
+        logger.debug(
+            "AuditLog: action=%s actor=%s booking=%s env=%s details=%s",
+            action, actor_id, row["booking_id"], row["environment_id"], row["details"]
+        )
+
+    @classmethod
+    def record_many(cls, action, actor_id, entries):
+        """Record one entry per dict of ``record`` fields in a single batch."""
+        rows = [cls._row(action, actor_id, **fields) for fields in entries]
+        if not rows:
+            return
+        sink = cls._sink()
+        if sink is not None and sink.has_room(len(rows)):
+            sink.defer(db.session(), rows)
+        else:
+            db.session.execute(insert(AuditLog.__table__), rows)
+        logger.debug("AuditLog: %d × action=%s actor=%s", len(rows), action, actor_id)
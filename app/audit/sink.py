@@ -0,0 +1,138 @@
+"""
+Asynchronous, batched writer for audit-log rows.
+
+Entries are queued in memory and written to ``audit_log`` by a background
+thread with one multi-row INSERT per batch, whenever ``batch_size`` entries
+are waiting or ``flush_interval`` seconds have passed. ``close()`` (also
+registered with ``atexit``) stops the thread and writes whatever is left.
+
+``AuditService`` parks a transaction's entries in ``session.info`` and
+``defer`` hands them to the sink only once that transaction commits, so a
+rolled-back booking leaves no audit rows. While the queue is full, entries
+are added to the caller's transaction instead (see ``has_room``); a failed
+batch is kept and retried on the next flush.
+"""
+import atexit
+import logging
+import queue
+import threading
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "audit_sink_rows"
+
+
+class AuditSink:
+
+    def __init__(self, app, batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = []
+        self._overflow = []
+        self._overflow_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def has_room(self, count=1):
+        """Whether ``count`` more entries fit in the queue right now."""
+        return self._queue.qsize() + count <= self._queue.maxsize
+
+    def defer(self, session, rows):
+        """Submit ``rows`` once ``session``'s transaction commits."""
+        if not session.in_transaction():
+            session.begin()  # so a rollback() before any query still discards them
+        session.info.setdefault(_PENDING_KEY, []).append((self, rows))
+
+    def submit(self, entry):
+        """Queue one ``audit_log`` row (a dict of column values); never blocks."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # only reachable by racing has_room(); the commit is already done
+            logger.warning("Audit queue full; entry kept for the next flush")
+            with self._overflow_lock:
+                self._overflow.append(entry)
+            self._wake.set()
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written."""
+        with self._write_lock:
+            batch, self._pending = self._pending, []
+            with self._overflow_lock:
+                batch += self._overflow
+                self._overflow = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return 0
+            try:
+                for i in range(0, len(batch), self.batch_size):
+                    self._write(batch[i:i + self.batch_size])
+            except Exception:
+                logger.exception("Audit flush failed; %d entries kept for retry", len(batch) - i)
+                self._pending = batch[i:]
+                return i
+            return len(batch)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        if self._pending:
+            logger.error("Audit sink closed with %d unwritten entries: %s",
+                         len(self._pending), self._pending)
+
+    def _write(self, rows):
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(insert(AuditLog.__table__), rows)
+        logger.debug("Audit sink wrote %d entries", len(rows))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending(session):
+    for sink, rows in session.info.pop(_PENDING_KEY, ()):
+        for row in rows:
+            sink.submit(row)
+
+
+# soft rollback: the deferred rows may be all the transaction holds, and a
+# transaction that never touched the database fires no after_rollback
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    if app.config.get("AUDIT_ASYNC"):
+        app.extensions["audit_sink"] = AuditSink(
+            app,
+            batch_size=app.config.get("AUDIT_BATCH_SIZE", 200),
+            flush_interval=app.config.get("AUDIT_FLUSH_INTERVAL", 1.0),
+        )
@@ -0,0 +1,182 @@
+"""
+Bounded LRU + TTL cache behind the Flask-Login user loader.
+
+Authenticated requests only need the user's id, email and role, so the loader
+hands out a lightweight ``CachedUser`` instead of querying ``users`` by
+primary key on every request. Entries expire after ``USER_CACHE_TTL``
+seconds.
+
+Updates and deletes of ``User`` rows (a role change, a removed account) drop
+the matching entry in this process once their transaction commits, and bump
+the ``users`` counter in ``cache_versions`` in the same transaction. Other
+processes compare that counter with the version their entries were loaded at
+at most once every ``USER_CACHE_VERSION_CHECK`` seconds and drop them all when
+it has moved. So a change is seen immediately by the process that made it and
+within ``USER_CACHE_VERSION_CHECK`` seconds (never later than
+``USER_CACHE_TTL``) everywhere else, while most requests touch no table.
+
+``USER_CACHE_SIZE = 0`` disables the cache.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User
+from app.versions import bump_version, current_version
+
+logger = logging.getLogger(__name__)
+
+USERS_KEY = "users"
+_PENDING_KEY = "user_cache_ids"
+
+
+class CachedUser(UserMixin):
+    """Detached, read-only stand-in for ``User`` on the request path."""
+
+    __slots__ = ("id", "email", "role")
+
+    def __init__(self, id, email, role):
+        self.id = id
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.email, user.role)
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.email} ({self.role})>"
+
+
+class UserCache:
+    """Thread-safe LRU of ``CachedUser`` records with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=60, version_check=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check = version_check
+        self._next_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        user = loader(user_id)
+        if user is None:
+            return None
+        record = CachedUser.from_user(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, record)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return record
+
+    def sync_due(self):
+        return time.monotonic() >= self._next_check
+
+    def sync(self, version):
+        """Drop every entry if the ``users`` counter moved since they were loaded."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.version_check
+            if version != self.version:
+                if self._entries:
+                    logger.debug("User cache cleared at users version %s", version)
+                self._entries.clear()
+                self.version = version
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "version": self.version,
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "version_check": self.version_check,
+            }
+
+
+def init_app(app):
+    size = app.config.get("USER_CACHE_SIZE", 0)
+    if size:
+        app.extensions["user_cache"] = UserCache(
+            size,
+            app.config.get("USER_CACHE_TTL", 60),
+            app.config.get("USER_CACHE_VERSION_CHECK", 5),
+        )
+
+
+def user_cache():
+    """The current app's cache, or None when it is disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("user_cache")
+
+
+def _load(user_id):
+    return db.session.get(User, user_id)
+
+
+def load_user(user_id):
+    """Flask-Login ``user_loader``: a ``CachedUser`` when caching, else the ``User``."""
+    user_id = int(user_id)
+    cache = user_cache()
+    if cache is None:
+        return _load(user_id)
+    if cache.sync_due():
+        cache.sync(current_version(USERS_KEY))
+    return cache.get(user_id, _load)
+
+
+# ── invalidation ─────────────────────────────────────────────────────────────
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    bump_version(connection, USERS_KEY)
+    if user_cache() is not None:
+        inspect(target).session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    cache = user_cache()
+    if user_ids and cache is not None:
+        for user_id in user_ids:
+            cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
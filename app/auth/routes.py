@@ -1,7 +1,9 @@
 import logging
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user, login_user, logout_user, login_required
 from app import db
+from app.auth.cache import user_cache
+from app.auth.decorators import admin_required
 from app.auth.service import AuthService
 from app.models import User
 from .forms import RegistrationForm, LoginForm
@@ -73,3 +75,11 @@ def logout():
     flash("You have been logged out.", "info")
     logger.info(f"User logged out")
     return redirect(url_for("auth.login"))
+
+@auth_bp.route("/cache")
+@login_required
+@admin_required
+def user_cache_stats():
+    """Hit/miss counters of the user-loader cache"""
+    cache = user_cache()
+    return jsonify(cache.stats() if cache else {"enabled": False})
@@ -24,3 +24,13 @@ class AuthService:
         if user and user.check_password(password):
             return user
         return None
+
+    @staticmethod
+    def set_role(user, role):
+        """Changes a user's role (cached logins in every process pick it up on commit)"""
+        if role not in ("regular", "admin"):
+            return False, f"Unknown role: {role}"
+        user.role = role
+        db.session.commit()
+        logger.info("Role of %s set to %s", user.email, role)
+        return True, None
@@ -0,0 +1,198 @@
+"""
+Subscribable ICS feeds of a user's or an environment's bookings.
+
+Feed URLs carry a signed token instead of a session, since calendar clients
+cannot log in. Besides ``kind`` + id the token names the user it was issued to
+and that user's feed secret version (``feed-secret:user:<id>`` in
+``cache_versions``); rotating the secret from the bookings page bumps the
+version and so revokes every feed URL the user has handed out. The version is
+read once per request however many links a page renders.
+
+Every feed has a change counter in ``cache_versions`` (``bookings:user:<id>``
+/ ``bookings:env:<id>``) bumped in the same transaction as any booking write
+that touches it, or any rename of an environment that appears in it. The ETag
+is built from that counter and the start of the feed window, so an unchanged
+poll is answered with 304 after a few primary-key lookups; otherwise the
+events are streamed from one range query.
+"""
+import logging
+from datetime import datetime, time, timedelta, timezone
+from flask import Response, abort, current_app, g, request, stream_with_context, url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import event, inspect, select
+from app import db
+from app.models import Booking, Environment, User
+from app.versions import bump_version, current_version, version_info
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("user", "env")
+WINDOW_PAST = timedelta(days=30)
+WINDOW_AHEAD = timedelta(days=365)
+CHUNK_SIZE = 500
+
+
+def version_key(kind, obj_id):
+    return f"bookings:{kind}:{obj_id}"
+
+
+# ── tokens ───────────────────────────────────────────────────────────────────
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="ics-feed")
+
+
+def secret_key(user_id):
+    return f"feed-secret:user:{user_id}"
+
+
+def rotate_secret(user_id):
+    """Revoke all feed URLs issued to ``user_id`` (takes effect on commit)."""
+    bump_version(db.session.connection(), secret_key(user_id))
+    g.pop("feed_secret_versions", None)
+
+
+def secret_version(user_id):
+    """The user's feed secret version, looked up once per request."""
+    versions = g.setdefault("feed_secret_versions", {})
+    if user_id not in versions:
+        versions[user_id] = current_version(secret_key(user_id))
+    return versions[user_id]
+
+
+def feed_token(kind, obj_id, user):
+    return _serializer().dumps([kind, obj_id, user.id, secret_version(user.id)])
+
+
+def read_token(token):
+    """``(kind, id)`` from a feed token; 404 unless signed by us and still current.
+
+    The issuing user must still exist with the same feed secret version, own
+    the feed for ``user`` tokens and be an admin for ``env`` tokens.
+    """
+    try:
+        kind, obj_id, user_id, secret = _serializer().loads(token)
+        obj_id, user_id = int(obj_id), int(user_id)
+    except (BadSignature, ValueError, TypeError):
+        abort(404)
+    if kind not in KINDS:
+        abort(404)
+    user = db.session.get(User, user_id)
+    if user is None or secret != current_version(secret_key(user_id)):
+        abort(404)
+    if (kind == "user" and obj_id != user_id) or (kind == "env" and user.role != "admin"):
+        abort(404)
+    return kind, obj_id
+
+
+def feed_url(kind, obj_id, user):
+    return url_for("bookings.ics_feed", token=feed_token(kind, obj_id, user), _external=True)
+
+
+# ── rendering ────────────────────────────────────────────────────────────────
+
+def ics_text(value):
+    """Escape a TEXT value (RFC 5545 §3.3.11)."""
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+                 .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def event_lines(booking_id, start, end, env_name, dtstamp):
+    return [
+        "BEGIN:VEVENT",
+        f"UID:booking-{booking_id}@easyenvbooker.local",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{start:%Y%m%dT%H%M%S}",
+        f"DTEND:{end:%Y%m%dT%H%M%S}",
+        f"SUMMARY:Booking for {ics_text(env_name)}",
+        "END:VEVENT",
+    ]
+
+
+def iter_feed(kind, obj_id, window_start, window_end, dtstamp):
+    """Yield the calendar in chunks of ``CHUNK_SIZE`` events."""
+    column = Booking.user_id if kind == "user" else Booking.environment_id
+    rows = db.session.execute(
+        select(Booking.id, Booking.start, Booking.end, Environment.name)
+        .join(Environment, Environment.id == Booking.environment_id)
+        .where(column == obj_id, Booking.end > window_start, Booking.start < window_end)
+        .order_by(Booking.start, Booking.id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    yield "\r\n".join([
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//EasyEnvBooker//EN",
+        "X-WR-CALNAME:" + ("My bookings" if kind == "user" else "Environment bookings"),
+    ]) + "\r\n"
+    for partition in rows.partitions():
+        lines = []
+        for row in partition:
+            lines += event_lines(*row, dtstamp)
+        yield "\r\n".join(lines) + "\r\n"
+    yield "END:VCALENDAR\r\n"
+
+
+def feed_window_start():
+    return datetime.combine(datetime.utcnow().date(), time.min) - WINDOW_PAST
+
+
+def feed_response(kind, obj_id):
+    """The feed as a streamed response, or a bare 304 if the client is current."""
+    version, updated_at = version_info(version_key(kind, obj_id))
+    window_start = feed_window_start()
+    etag = f"{kind}-{obj_id}-v{version}-{window_start:%Y%m%d}"
+    # the window moves daily, so it counts as a modification too
+    last_modified = max(updated_at or window_start, window_start)
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    headers = {"Cache-Control": "private, max-age=0, must-revalidate"}
+    if request.if_none_match:
+        unchanged = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        unchanged = since is not None and last_modified <= since
+    if unchanged:
+        resp = Response(status=304, headers=headers)
+    else:
+        dtstamp = f"{last_modified:%Y%m%dT%H%M%SZ}"
+        chunks = iter_feed(kind, obj_id, window_start,
+                           window_start + WINDOW_PAST + WINDOW_AHEAD, dtstamp)
+        resp = Response(stream_with_context(chunks),
+                        content_type="text/calendar; charset=utf-8", headers=headers)
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    return resp
+
+
+# ── change counters ──────────────────────────────────────────────────────────
+
+def bump_feeds(connection, user_ids=(), env_ids=()):
+    bump_version(connection,
+                 *(version_key("user", uid) for uid in user_ids),
+                 *(version_key("env", eid) for eid in env_ids))
+
+
+@event.listens_for(Booking, "after_insert")
+@event.listens_for(Booking, "after_delete")
+def _booking_changed(mapper, connection, target):
+    bump_feeds(connection, [target.user_id], [target.environment_id])
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    attrs = inspect(target).attrs
+    bump_feeds(connection,
+               [target.user_id, *attrs.user_id.history.deleted],
+               [target.environment_id, *attrs.environment_id.history.deleted])
+
+
+@event.listens_for(Environment, "after_update")
+def _environment_updated(mapper, connection, target):
+    # the name is in every event SUMMARY of the environment's and its bookers' feeds
+    if not inspect(target).attrs.name.history.has_changes():
+        return
+    user_ids = connection.execute(
+        select(Booking.user_id).distinct().where(
+            Booking.environment_id == target.id, Booking.end > feed_window_start()
+        )
+    ).scalars().all()
+    bump_feeds(connection, user_ids, [target.id])
@@ -2,6 +2,7 @@ from flask_wtf import FlaskForm
 from wtforms import DateTimeLocalField, HiddenField, SelectField, SelectMultipleField, SubmitField, ValidationError
 from wtforms.validators import DataRequired
 from datetime import datetime
+from app.environment.catalog import environment_catalog
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,11 +37,8 @@ class BookingForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Dynamically populate environment dropdown from database
-        from app.models import Environment
-        self.environment.choices = [
-            (e.id, e.name) for e in Environment.query.order_by(Environment.name)
-        ]
+        # Dynamically populate environment dropdown from the cached catalog
+        self.environment.choices = environment_catalog().choices()
         logger.debug("BookingForm initialized with environment choices: %s", self.environment.choices)
 
     def validate_start(self, field):
@@ -94,11 +92,8 @@ class SeriesBookingForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Populate environment choices from database
-        from app.models import Environment
-        self.environment.choices = [
-            (e.id, e.name) for e in Environment.query.order_by(Environment.name)
-        ]
+        # Populate environment choices from the cached catalog
+        self.environment.choices = environment_catalog().choices()
         logger.debug("SeriesBookingForm initialized with environment choices: %s", self.environment.choices)
 
     def validate_start_dt(self, field):
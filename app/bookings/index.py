@@ -0,0 +1,183 @@
+"""
+Process-local interval index of bookings, one sorted list per environment.
+
+Each environment's bookings are loaded lazily (a single query) the first time
+that environment is checked, and afterwards overlap queries are answered from
+memory in O(log n + k), where k is the number of bookings starting within one
+"longest booking" of the queried interval.
+
+The index is kept in sync through ORM events: inserts, updates and deletes of
+``Booking`` rows are queued on the session and applied once the transaction
+commits. A rollback drops the queued changes and invalidates the touched
+environments so they are rebuilt on next use.
+
+The index only sees writes made by this process, so enable it
+(``BOOKING_INDEX_ENABLED``) only where one process owns booking writes.
+"""
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Booking
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "booking_index_ops"
+
+
+class _EnvIntervals:
+    """Bookings of a single environment, sorted by start."""
+
+    def __init__(self, rows):
+        self._starts = []
+        self._ids = []
+        self._spans = {}
+        self._max_len = timedelta(0)
+        for booking_id, start, end in sorted(rows, key=lambda r: (r[1], r[0])):
+            self._starts.append(start)
+            self._ids.append(booking_id)
+            self._spans[booking_id] = (start, end)
+            self._max_len = max(self._max_len, end - start)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def add(self, booking_id, start, end):
+        self.remove(booking_id)
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ids.insert(i, booking_id)
+        self._spans[booking_id] = (start, end)
+        # max_len only ever grows; a stale (too large) value just widens scans
+        self._max_len = max(self._max_len, end - start)
+
+    def remove(self, booking_id):
+        span = self._spans.pop(booking_id, None)
+        if span is None:
+            return
+        i = bisect_left(self._starts, span[0])
+        while self._ids[i] != booking_id:
+            i += 1
+        del self._starts[i]
+        del self._ids[i]
+
+    def overlapping(self, start, end, exclude_id=None):
+        # Anything starting at or before (start - max_len) has already ended.
+        lo = bisect_right(self._starts, start - self._max_len)
+        hi = bisect_left(self._starts, end)
+        hits = []
+        for i in range(lo, hi):
+            booking_id = self._ids[i]
+            b_start, b_end = self._spans[booking_id]
+            if b_end > start and booking_id != exclude_id:
+                hits.append((b_start, b_end, booking_id))
+        return hits
+
+
+class IntervalIndex:
+    """Thread-safe map of environment id → sorted booking intervals."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._envs = {}
+        self._lock = threading.RLock()
+
+    def _env(self, env_id):
+        intervals = self._envs.get(env_id)
+        if intervals is None:
+            intervals = _EnvIntervals(self._loader(env_id))
+            self._envs[env_id] = intervals
+            logger.debug("Interval index built for env=%s (%d bookings)",
+                         env_id, len(intervals))
+        return intervals
+
+    def overlapping(self, env_id, start, end, exclude_id=None):
+        """Return ``(start, end, id)`` of every booking overlapping [start, end)."""
+        with self._lock:
+            return self._env(env_id).overlapping(start, end, exclude_id)
+
+    def overlaps(self, env_id, start, end, exclude_id=None):
+        return bool(self.overlapping(env_id, start, end, exclude_id))
+
+    def add(self, env_id, booking_id, start, end):
+        with self._lock:
+            if env_id in self._envs:
+                self._envs[env_id].add(booking_id, start, end)
+
+    def remove(self, env_id, booking_id):
+        with self._lock:
+            if env_id in self._envs:
+                self._envs[env_id].remove(booking_id)
+
+    def invalidate(self, env_id=None):
+        """Forget one environment (or all of them); it is reloaded on next use."""
+        with self._lock:
+            if env_id is None:
+                self._envs.clear()
+            else:
+                self._envs.pop(env_id, None)
+
+
+def _load_env_bookings(env_id):
+    return db.session.query(Booking.id, Booking.start, Booking.end).filter(
+        Booking.environment_id == env_id
+    ).all()
+
+
+def init_app(app):
+    if app.config.get("BOOKING_INDEX_ENABLED"):
+        app.extensions["booking_index"] = IntervalIndex(_load_env_bookings)
+
+
+def booking_index():
+    """The current app's index, or None when it is disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("booking_index")
+
+
+# ── keeping the index in sync ────────────────────────────────────────────────
+
+def queue_change(session, op, *args):
+    """Queue an index update to be applied when ``session`` commits."""
+    index = booking_index()
+    if index is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((index, op, args))
+
+
+@event.listens_for(Booking, "after_insert")
+def _booking_inserted(mapper, connection, target):
+    queue_change(inspect(target).session, "add",
+                 target.environment_id, target.id, target.start, target.end)
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    history = inspect(target).attrs.environment_id.history
+    old_env = history.deleted[0] if history.deleted else target.environment_id
+    session = inspect(target).session
+    queue_change(session, "remove", old_env, target.id)
+    queue_change(session, "add",
+                 target.environment_id, target.id, target.start, target.end)
+
+
+@event.listens_for(Booking, "after_delete")
+def _booking_deleted(mapper, connection, target):
+    queue_change(inspect(target).session, "remove", target.environment_id, target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for index, op, args in session.info.pop(_PENDING_KEY, []):
+        getattr(index, op)(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    for index, op, args in session.info.pop(_PENDING_KEY, []):
+        # the env may have been loaded with the now rolled-back rows in it
+        index.invalidate(args[0])
@@ -0,0 +1,67 @@
+"""
+Pure helpers for working with booking intervals in memory.
+
+Intervals are ``(start, end, ...)`` tuples of naive datetimes; anything after
+the first two items (e.g. a booking id) is ignored.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta, time
+
+ONE_DAY = timedelta(days=1)
+
+
+def merge_busy(intervals):
+    """Sweep intervals by start and merge overlapping/touching ones."""
+    merged = []
+    for iv in sorted(intervals, key=lambda iv: iv[0]):
+        start, end = iv[0], iv[1]
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_gaps(busy, lo, hi):
+    """Yield the ``(start, end)`` gaps of [lo, hi) not covered by ``busy``."""
+    cursor = lo
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= hi:
+            break
+        if start > cursor:
+            yield cursor, start
+        cursor = max(cursor, end)
+    if cursor < hi:
+        yield cursor, hi
+
+
+def overlaps_any(busy, start, end):
+    """True if [start, end) overlaps any interval of the merged ``busy`` list."""
+    i = bisect_right(busy, (start, datetime.max))
+    # the interval starting at or before ``start`` may still be running
+    if i and busy[i - 1][1] > start:
+        return True
+    return i < len(busy) and busy[i][0] < end
+
+
+def split_by_day(start, end):
+    """Yield ``(day, seconds)`` for each calendar day [start, end) touches."""
+    day = start.date()
+    while start < end:
+        next_midnight = datetime.combine(day + ONE_DAY, time.min)
+        piece_end = min(end, next_midnight)
+        yield day, (piece_end - start).total_seconds()
+        start, day = piece_end, day + ONE_DAY
+
+
+def seconds_by_day(intervals):
+    """Total booked seconds per calendar day, split across midnight."""
+    totals = defaultdict(float)
+    for iv in intervals:
+        for day, secs in split_by_day(iv[0], iv[1]):
+            totals[day] += secs
+    return totals
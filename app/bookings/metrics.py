@@ -0,0 +1,67 @@
+"""
+Booking domain metrics, recorded by ``BookingService`` into the app's
+metrics registry (see ``app.monitoring.registry``).
+
+They answer the tuning questions the HTTP metrics cannot: how often booking
+attempts clash or hit ``DAILY_UTILIZATION_CAP`` per environment, how far
+suggestion searches must move within ``SUGGESTION_WINDOW`` (and how many
+queries they cost), and how large series are and how long validating them
+takes. Environments are labelled by id, which survives renames.
+"""
+from app.monitoring.registry import metrics_registry
+
+OFFSET_BUCKETS = (1, 2, 4, 6, 8, 12, 16, 24, 32, 48, 64, 96)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20)
+SLOT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def booking_created(env_id, kind, count=1):
+    """``kind``: single, suggestion, series, forced_single or forced_series."""
+    registry = metrics_registry()
+    if registry is not None:
+        registry.counter("booking_created_total", "Bookings created.",
+                         ("environment", "kind")).inc(count, environment=env_id, kind=kind)
+
+
+def booking_forced(env_id, kind):
+    """One admin override: forced_single, forced_series or forced_edit."""
+    registry = metrics_registry()
+    if registry is not None:
+        registry.counter("booking_forced_total", "Admin overrides of validation.",
+                         ("environment", "kind")).inc(environment=env_id, kind=kind)
+
+
+def booking_rejected(env_id, reason, count=1):
+    """``reason``: clash, cap, duration or invalid."""
+    registry = metrics_registry()
+    if registry is not None:
+        registry.counter("booking_rejected_total", "Booked slots failing validation.",
+                         ("environment", "reason")).inc(count, environment=env_id, reason=reason)
+
+
+def suggestion_search(kind, offsets_tried, queries, found):
+    """One ``find_suggestions`` (``kind="single"``) or ``find_series_suggestion`` run."""
+    registry = metrics_registry()
+    if registry is None:
+        return
+    registry.counter("booking_suggestion_searches_total", "Suggestion searches by outcome.",
+                     ("kind", "found")).inc(kind=kind, found=str(found).lower())
+    registry.histogram("booking_suggestion_offsets_tried",
+                       "Grid offsets (-1, +1, -2, ...) up to the first free one, "
+                       "or the whole window when none is free.",
+                       OFFSET_BUCKETS, ("kind",)).observe(offsets_tried, kind=kind)
+    registry.histogram("booking_suggestion_queries", "SQL statements per suggestion search.",
+                       QUERY_BUCKETS, ("kind",)).observe(queries, kind=kind)
+
+
+def series_validated(slots, seconds, queries):
+    """One ``create_series`` validation pass."""
+    registry = metrics_registry()
+    if registry is None:
+        return
+    registry.histogram("booking_series_slots", "Slots per series booking.",
+                       SLOT_BUCKETS).observe(slots)
+    registry.histogram("booking_series_validation_seconds", "Time to validate a series.",
+                       SECONDS_BUCKETS).observe(seconds)
+    registry.histogram("booking_series_validation_queries",
+                       "SQL statements per series validation.", QUERY_BUCKETS).observe(queries)
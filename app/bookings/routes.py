@@ -1,15 +1,20 @@
 # Flask Blueprint for handling all booking-related routes
 from flask import (
-    Blueprint, render_template, redirect, url_for, flash, abort, request
+    Blueprint, render_template, redirect, url_for, flash, abort, request, jsonify
 )
 from flask_login import login_required, current_user
 from markupsafe import Markup
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
 from app import db
 from app.environment.forms import DeleteForm
-from app.models import Environment, Booking
+from app.models import Environment, Booking, User
 from app.bookings.forms import BookingForm, SeriesBookingForm
 from app.bookings.service import BookingService
+from app.bookings import feeds
+from app.environment.catalog import environment_catalog
+import base64
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,30 +23,248 @@ logger = logging.getLogger(__name__)
 bookings_bp = Blueprint("bookings", __name__, url_prefix="/bookings")
 
 
-@bookings_bp.route("/")
-@login_required
-def list_bookings():
-    """Displays upcoming bookings. Admins can switch between All/My."""
-    now = datetime.utcnow()
-    base_q = Booking.query.filter(Booking.start >= now).order_by(Booking.start)
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(booking):
+    """Opaque cursor pointing just past ``booking`` in (start, id) order."""
+    raw = f"{booking.start.isoformat()}|{booking.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(start), int(booking_id)
+    except ValueError:
+        abort(400, description="Invalid cursor.")
+
+
+def upcoming_bookings(user_id=None):
+    """Upcoming bookings (optionally one user's) with environment and user eager-loaded."""
+    q = (
+        Booking.query
+        .options(joinedload(Booking.environment), joinedload(Booking.user))
+        .filter(Booking.start >= datetime.utcnow())
+    )
+    if user_id is not None:
+        q = q.filter(Booking.user_id == user_id)
+    return q
+
+
+def bookings_page(user_id=None, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of upcoming bookings, soonest first, using keyset pagination
+    on (start, id). Returns ``(bookings, next_cursor)``.
+    """
+    q = upcoming_bookings(user_id).order_by(Booking.start, Booking.id)
+    if cursor:
+        q = q.filter(tuple_(Booking.start, Booking.id) > decode_cursor(cursor))
 
-    # figure out which view to show
+    bookings = q.limit(limit + 1).all()
+    next_cursor = encode_cursor(bookings[limit - 1]) if len(bookings) > limit else None
+    return bookings[:limit], next_cursor
+
+
+def _list_view():
+    """The view to show: admins can switch between All/My, others only see theirs."""
     if current_user.role == "admin":
         view = request.args.get("view", "all")
-        if view == "mine":
-            bookings = base_q.filter_by(user_id=current_user.id).all()
-        else:
-            bookings = base_q.all()
     else:
         view = "mine"
-        bookings = base_q.filter_by(user_id=current_user.id).all()
+    return view, (current_user.id if view == "mine" else None)
+
+
+def _contains_pattern(term):
+    """LIKE pattern matching ``term`` literally anywhere (escape character ``\\``)."""
+    term = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{term}%"
+
+
+def _limit_arg(name, default=PAGE_SIZE):
+    return min(max(request.args.get(name, default, type=int), 1), MAX_PAGE_SIZE)
+
+
+@bookings_bp.route("/")
+@login_required
+def list_bookings():
+    """Displays upcoming bookings. Admins can switch between All/My."""
+    view, user_id = _list_view()
+    limit = _limit_arg("limit")
+    bookings, next_cursor = bookings_page(user_id, request.args.get("cursor"), limit)
 
     return render_template(
         "bookings/list.html",
         bookings=bookings,
         delete_form=DeleteForm(),
-        view=view
+        view=view,
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+@bookings_bp.route("/data")
+@login_required
+def list_bookings_data():
+    """
+    DataTables server-side processing endpoint for the bookings list.
+
+    Reads ``draw``/``start``/``length`` and the per-column search values
+    (0 = environment, 1 = start date, 3 = user email) and answers with
+    ``draw``, ``recordsTotal``, ``recordsFiltered`` and ``data``.
+    """
+    _, user_id = _list_view()
+    base_q = upcoming_bookings(user_id)
+    total = base_q.order_by(None).count()
+
+    env_search = request.args.get("columns[0][search][value]", "").strip()
+    date_search = request.args.get("columns[1][search][value]", "").strip().lstrip("^")
+    user_search = request.args.get("columns[3][search][value]", "").strip()
+
+    q = base_q
+    if env_search:
+        q = q.filter(Booking.environment.has(
+            Environment.name.ilike(_contains_pattern(env_search), escape="\\")
+        ))
+    if date_search:
+        try:
+            day = datetime.strptime(date_search, "%Y-%m-%d")
+        except ValueError:
+            abort(400, description="Invalid date filter.")
+        q = q.filter(Booking.start >= day, Booking.start < day + timedelta(days=1))
+    if user_search and current_user.role == "admin":
+        q = q.filter(Booking.user.has(
+            User.email.ilike(_contains_pattern(user_search), escape="\\")
+        ))
+
+    filtered = q.order_by(None).count()
+    offset = max(request.args.get("start", 0, type=int), 0)
+    rows = (
+        q.order_by(Booking.start, Booking.id)
+        .offset(offset)
+        .limit(_limit_arg("length", 10))
+        .all()
+    )
+
+    return jsonify({
+        "draw": request.args.get("draw", 0, type=int),
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [
+            {
+                "id": b.id,
+                "environment": b.environment.name,
+                "start": b.start.strftime("%Y-%m-%d %H:%M"),
+                "end": b.end.strftime("%Y-%m-%d %H:%M"),
+                "user": b.user.email,
+                "edit_url": url_for("bookings.edit_booking", booking_id=b.id),
+                "delete_url": url_for("bookings.delete_booking", booking_id=b.id),
+                "ics_url": url_for("bookings.download_ics", booking_id=b.id),
+            }
+            for b in rows
+        ],
+    })
+
+MAX_AVAILABILITY_RANGE = timedelta(days=31)
+MAX_AVAILABILITY_ENVS = 50
+
+
+def _iso(value):
+    return value.isoformat(timespec="minutes")
+
+
+@bookings_bp.route("/availability")
+@login_required
+def availability():
+    """
+    Free/busy JSON for one or more environments:
+    ``?env=1&env=2&start=2030-01-07T08:00&end=2030-01-08T18:00[&duration=60]``
+    (duration in minutes). Bookable windows respect the 8 hour limit and the
+    daily cap, so a booking inside one passes validation unless the slot is
+    taken in the meantime.
+    """
+    env_ids = request.args.getlist("env", type=int)
+    try:
+        start = datetime.fromisoformat(request.args["start"])
+        end = datetime.fromisoformat(request.args["end"])
+    except (KeyError, ValueError):
+        abort(400, description="start and end must be ISO datetimes.")
+    duration = request.args.get("duration", type=int)
+    if not env_ids or len(env_ids) > MAX_AVAILABILITY_ENVS:
+        abort(400, description=f"Pass 1 to {MAX_AVAILABILITY_ENVS} env ids.")
+    if not start < end <= start + MAX_AVAILABILITY_RANGE:
+        abort(400, description="The range must be non-empty and at most 31 days.")
+    if duration is not None and duration <= 0:
+        abort(400, description="duration must be a positive number of minutes.")
+
+    catalog = environment_catalog()
+    envs = [catalog.get(env_id) or abort(404) for env_id in dict.fromkeys(env_ids)]
+    result = BookingService.availability(
+        [e.id for e in envs], start, end,
+        duration=timedelta(minutes=duration) if duration else None,
     )
+    return jsonify({
+        "start": _iso(start),
+        "end": _iso(end),
+        "environments": [
+            {
+                "id": env.id,
+                "name": env.name,
+                "busy": [[_iso(s), _iso(e)] for s, e in result[env.id]["busy"]],
+                "free": [[_iso(s), _iso(e)] for s, e in result[env.id]["free"]],
+                "bookable": [
+                    {
+                        "start": _iso(w["start"]),
+                        "latest_start": _iso(w["latest_start"]),
+                        "end": _iso(w["end"]),
+                        "max_duration_minutes": int(w["max_duration"].total_seconds() // 60),
+                    }
+                    for w in result[env.id]["bookable"]
+                ],
+            }
+            for env in envs
+        ],
+    })
+
+@bookings_bp.route("/free", methods=["GET", "POST"])
+@login_required
+def free_environments():
+    """
+    GET ``?start=..&end=..[&squad=..]``: environments free for the slot, least
+    used that day first. POST the same fields as JSON to book the best one.
+    """
+    args = request.get_json() if request.method == "POST" else request.args
+    try:
+        start = datetime.fromisoformat(args["start"])
+        end = datetime.fromisoformat(args["end"])
+    except (KeyError, TypeError, ValueError):
+        abort(400, description="start and end must be ISO datetimes.")
+    squad = args.get("squad") or None
+
+    if request.method == "GET":
+        return jsonify({
+            "start": _iso(start),
+            "end": _iso(end),
+            "environments": [
+                {"id": env_id, "name": name, "used_minutes": int(used) // 60}
+                for env_id, name, used in BookingService.find_free_environments(start, end, squad)
+            ],
+        })
+
+    if start < datetime.now():
+        abort(400, description="Cannot book a time in the past.")
+    booking = BookingService.book_first_free(current_user, start, end, squad)
+    if booking is None:
+        return jsonify({"error": "No environment is free for that slot."}), 409
+    logger.info("Booked first free env for %s: %s (%s to %s)",
+                current_user.email, booking.environment.name, start, end)
+    return jsonify({
+        "id": booking.id,
+        "environment": {"id": booking.environment_id, "name": booking.environment.name},
+        "start": _iso(booking.start),
+        "end": _iso(booking.end),
+    }), 201
 
 @bookings_bp.route("/new", methods=["GET", "POST"])
 @login_required
@@ -234,6 +457,31 @@ def download_ics(booking_id):
     return BookingService.generate_ics_response(booking)
 
 
+@bookings_bp.route("/feed/<token>.ics")
+def ics_feed(token):
+    """Subscribable calendar of a user's or an environment's bookings (signed URL)"""
+    kind, obj_id = feeds.read_token(token)
+    return feeds.feed_response(kind, obj_id)
+
+
+@bookings_bp.route("/feed/rotate", methods=["POST"])
+@login_required
+def rotate_feed_secret():
+    """Invalidate every calendar feed URL the current user has handed out"""
+    if not DeleteForm().validate_on_submit():
+        abort(400)
+    feeds.rotate_secret(current_user.id)
+    db.session.commit()
+    logger.info("Feed secret rotated by %s", current_user.email)
+    flash("Your calendar feed links were reset. Subscribe again with the new link.", "success")
+    return redirect(url_for("bookings.list_bookings"))
+
+
+@bookings_bp.app_template_global()
+def ics_feed_url(kind, obj_id):
+    return feeds.feed_url(kind, obj_id, current_user)
+
+
 @bookings_bp.route("/<int:booking_id>/edit", methods=["GET", "POST"])
 @login_required
 def edit_booking(booking_id):
@@ -1,11 +1,23 @@
-import json
 import logging
+import numpy as np
+from collections import Counter
 from datetime import datetime, timedelta, timezone, time, date
+from time import perf_counter
 from flask import Response, url_for
-from sqlalchemy import func
 from markupsafe import escape
+from sqlalchemy import and_, func, insert, select
 from app import db
-from app.models import Booking, AuditLog, Environment
+from app.models import Booking, Environment, EnvironmentDailyUsage
+from app.audit.service import AuditService
+from app.bookings.index import booking_index, queue_change
+from app.bookings.locks import environment_lock
+from app.main.stats import queue_invalidation
+from app.monitoring.metrics import count_statements
+from app.bookings import feeds, usage
+from app.bookings import metrics as booking_metrics
+from app.bookings.intervals import (
+    ONE_DAY, free_gaps, merge_busy, overlaps_any, seconds_by_day, split_by_day
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,67 +28,61 @@ class BookingService:
     SUGGESTION_STEP = timedelta(minutes=15)
 
     @staticmethod
-    def log_action(action, actor_id, details=None, commit=True):
-        """
-        Always record an AuditLog entry:
-          - dict → JSON‐dumped
-          - anything else → str()
-        """
-        if isinstance(details, dict):
-            details = json.dumps(details, default=str)
-        else:
-            details = str(details) if details is not None else None
-
-        entry = AuditLog(
-            action=action,
-            actor_id=actor_id,
-            details=details
-        )
-        db.session.add(entry)
-        if commit:
-            db.session.commit()
+    def log_action(action, actor_id, details=None, commit=True, **fields):
+        """Record an AuditLog entry (see ``AuditService.record``)."""
+        AuditService.record(action, actor_id, details=details, commit=commit, **fields)
 
-        logger.debug(
-            "AuditLog: action=%s actor=%s details=%s",
-            action, actor_id, details
-        )
+    @staticmethod
+    def _booking_fields(booking_id, environment, start, end, forced=False):
+        return {"booking_id": booking_id, "environment_id": environment.id,
+                "environment_name": environment.name,
+                "start": start, "end": end, "forced": forced}
 
     @staticmethod
     def _overlap_exists(env_id, start, end, exclude_id=None):
-        q = db.session.query(Booking.id).filter(
+        index = booking_index()
+        if index is not None:
+            exists = index.overlaps(env_id, start, end, exclude_id)
+        else:
+            q = db.session.query(Booking.id).filter(
+                Booking.environment_id == env_id,
+                Booking.end > start,
+                Booking.start < end
+            )
+            if exclude_id:
+                q = q.filter(Booking.id != exclude_id)
+            exists = db.session.query(q.exists()).scalar()
+        logger.debug("Overlap check: env=%s start=%s end=%s excl=%s → %s",
+                     env_id, start, end, exclude_id, exists)
+        return exists
+
+    @staticmethod
+    def _load_intervals(env_id, start, end, exclude_id=None):
+        """Every booking of ``env_id`` overlapping [start, end) as
+        ``(start, end, id)`` tuples, fetched with a single range query."""
+        index = booking_index()
+        if index is not None:
+            return index.overlapping(env_id, start, end, exclude_id)
+        q = db.session.query(Booking.start, Booking.end, Booking.id).filter(
             Booking.environment_id == env_id,
             Booking.end > start,
             Booking.start < end
         )
         if exclude_id:
             q = q.filter(Booking.id != exclude_id)
-        exists = db.session.query(q.exists()).scalar()
-        logger.debug("Overlap check: env=%s start=%s end=%s excl=%s → %s",
-                     env_id, start, end, exclude_id, exists)
-        return exists
+        rows = [tuple(r) for r in q.order_by(Booking.start)]
+        logger.debug("Loaded %d bookings for env=%s in %s–%s",
+                     len(rows), env_id, start, end)
+        return rows
 
     @staticmethod
     def _daily_util_seconds(env_id, day, exclude_id=None):
-        day_start = datetime.combine(day, time.min)
-        day_end   = datetime.combine(day, time.max)
-
-        q = db.session.query(
-            func.coalesce(
-                func.sum(
-                    func.strftime('%s', func.min(Booking.end, day_end))
-                    - func.strftime('%s', func.max(Booking.start, day_start))
-                ),
-                0
-            )
-        ).filter(
-            Booking.environment_id == env_id,
-            Booking.end > day_start,
-            Booking.start < day_end
-        )
+        secs = usage.used_seconds(env_id, day)
         if exclude_id:
-            q = q.filter(Booking.id != exclude_id)
+            excluded = db.session.get(Booking, exclude_id)
+            if excluded is not None and excluded.environment_id == env_id:
+                secs -= sum(s for d, s in split_by_day(excluded.start, excluded.end) if d == day)
 
-        secs = q.scalar() or 0
         logger.debug("Daily util for env=%s on %s excl=%s → %s sec",
                      env_id, day, exclude_id, secs)
         return secs
@@ -85,35 +91,78 @@ class BookingService:
     def _validate_single(cls, env_id, start, end, exclude_id=None):
         logger.debug("Validating: env=%s start=%s end=%s excl=%s",
                      env_id, start, end, exclude_id)
+        error = cls._single_error(env_id, start, end, exclude_id)
+        if error:
+            reason, err = error
+            booking_metrics.booking_rejected(env_id, reason)
+            return False, err
+        return True, None
+
+    @classmethod
+    def _single_error(cls, env_id, start, end, exclude_id=None):
+        """``(reason, message)`` of the first failed check, or None if the slot is bookable."""
         if end <= start:
-            return False, "End time must be after start time."
+            return "invalid", "End time must be after start time."
         duration = end - start
         if duration > cls.MAX_DURATION:
-            return False, "Booking cannot exceed 8 hours."
+            return "duration", "Booking cannot exceed 8 hours."
         used = cls._daily_util_seconds(env_id, start.date(), exclude_id)
         if used + duration.total_seconds() > 24*3600*cls.DAILY_UTILIZATION_CAP:
-            return False, "Cannot book: daily utilization cap (90%) reached."
+            return "cap", "Cannot book: daily utilization cap (90%) reached."
         if cls._overlap_exists(env_id, start, end, exclude_id):
-            return False, "Booking failed due to clash. No alternative series available within ±3 hours."
-        return True, None
+            return "clash", "Booking failed due to clash. No alternative series available within ±3 hours."
+        return None
+
+    @classmethod
+    def _validate_series(cls, env_id, slots):
+        """
+        Validate every series slot against one range query of the
+        environment's bookings and return all ``(slot_start, reason, error)``
+        failures (reasons as in ``_single_error``).
+        """
+        if not slots:
+            return []
+        span_start = datetime.combine(min(s for s, _ in slots).date(), time.min)
+        span_end = datetime.combine(max(e for _, e in slots).date(), time.max)
+        existing = cls._load_intervals(env_id, span_start, span_end)
+        used_by_day = seconds_by_day(existing)
+        busy = merge_busy(existing)
+        cap = 24*3600*cls.DAILY_UTILIZATION_CAP
+
+        failures = []
+        for start, end in slots:
+            if end <= start:
+                reason, err = "invalid", "End time must be after start time."
+            elif end - start > cls.MAX_DURATION:
+                reason, err = "duration", "Booking cannot exceed 8 hours."
+            elif used_by_day[start.date()] + (end - start).total_seconds() > cap:
+                reason, err = "cap", "Cannot book: daily utilization cap (90%) reached."
+            elif overlaps_any(busy, start, end):
+                reason, err = "clash", "Booking failed due to clash. No alternative series available within ±3 hours."
+            else:
+                continue
+            failures.append((start, reason, err))
+
+        reasons = Counter(reason for _, reason, _ in failures)
+        for reason, count in reasons.items():
+            booking_metrics.booking_rejected(env_id, reason, count)
+        logger.debug("Validated %d series slots for env=%s: %d failing",
+                     len(slots), env_id, len(failures))
+        return failures
 
     @classmethod
     def delete_booking(cls, booking, user, commit=True):
         """
         Delete a Booking and emit an AuditLog entry.
         """
-        # Build a human-readable message
-        msg = (
-            f"Deleted booking #{booking.id} in env “{booking.environment.name}” "
-            f"from "
-            f"{booking.start:%Y-%m-%d %H:%M} to {booking.end:%Y-%m-%d %H:%M}"
-        )
+        fields = cls._booking_fields(booking.id, booking.environment,
+                                     booking.start, booking.end)
 
         # Perform deletion
         db.session.delete(booking)
 
         # Audit-log it
-        cls.log_action("delete_booking", user.id, details=msg, commit=False)
+        cls.log_action("delete_booking", user.id, commit=False, **fields)
 
         # Commit if desired
         if commit:
@@ -135,20 +184,57 @@ class BookingService:
         logger.debug("Built %d series slots", len(slots))
         return slots
 
+    @staticmethod
+    def _insert_bookings(rows):
+        """
+        Insert many bookings with one multi-row statement and return their
+        ids in the order of ``rows``.
+        """
+        table = Booking.__table__
+        dialect = db.session.get_bind().dialect
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            return db.session.scalars(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+
+        # No RETURNING (e.g. MySQL): read the ids back by slot start. Series
+        # slots start on distinct days, and writes to the environment are
+        # serialized, so the newest matching row is ours.
+        db.session.execute(insert(table), rows)
+        first = rows[0]
+        found = db.session.execute(
+            select(table.c.start, table.c.id)
+            .where(table.c.environment_id == first["environment_id"],
+                   table.c.user_id == first["user_id"],
+                   table.c.start.in_([r["start"] for r in rows]))
+            .order_by(table.c.id)
+        ).all()
+        ids_by_start = dict(found)
+        return [ids_by_start[r["start"]] for r in rows]
+
     @classmethod
     def _bulk_insert_with_audit(cls, user, environment, slots, action):
-        for start, end in slots:
-            b = Booking(environment_id=environment.id,
-                        user_id=user.id, start=start, end=end)
-            db.session.add(b)
-            db.session.flush()
-
-            msg = (
-                f"booking #{b.id} in env “{environment.name}” "
-                f"from {start:%Y-%m-%d %H:%M} "
-                f"to {end:%Y-%m-%d %H:%M}"
-            )
-            cls.log_action(action, user.id, details=msg, commit=False)
+        if not slots:
+            return 0
+        ids = cls._insert_bookings([
+            {"environment_id": environment.id, "user_id": user.id,
+             "start": start, "end": end}
+            for start, end in slots
+        ])
+
+        AuditService.record_many(action, user.id, [
+            cls._booking_fields(booking_id, environment, start, end,
+                                forced=action.startswith("forced"))
+            for booking_id, (start, end) in zip(ids, slots)
+        ])
+
+        # Core inserts bypass the ORM events, so sync the rollup and index here
+        usage.apply_many(db.session.connection(), environment.id, slots)
+        for booking_id, (start, end) in zip(ids, slots):
+            queue_change(db.session, "add", environment.id, booking_id, start, end)
+        queue_invalidation(db.session, user.id)
+        feeds.bump_feeds(db.session.connection(), [user.id], [environment.id])
 
         logger.info("Bulk inserted %d bookings for user %s", len(slots), user.id)
         return len(slots)
@@ -163,46 +249,59 @@ class BookingService:
         if not slots:
             return False, "No valid weekday slots in the given date range."
 
-        for s, e in slots:
-            ok, err = cls._validate_single(environment.id, s, e)
-            if not ok:
+        with environment_lock(environment.id):
+            started = perf_counter()
+            with count_statements() as queries:
+                failures = cls._validate_series(environment.id, slots)
+            booking_metrics.series_validated(len(slots), perf_counter() - started, queries[0])
+            if failures:
+                s, _, err = failures[0]
                 msg = f"Series failed on {s:%Y-%m-%d %H:%M}: {err}"
+                if len(failures) > 1:
+                    msg += f" ({len(failures) - 1} more slot(s) also failed)"
                 logger.warning(msg)
                 return False, msg
 
-        try:
-            count = cls._bulk_insert_with_audit(user, environment, slots, "create_series")
-            db.session.commit()
-            logger.info("Created series of %d bookings for user %s", count, user.id)
-
-            # SUMMARY log for the whole series
-            summary = (
-                f"Created series of {count} bookings in env “{environment.name}” "
-                f"from {start_date:%Y-%m-%d} "
-                f"to {end_date:%Y-%m-%d}"
-            )
-            cls.log_action("create_series_summary", user.id, details=summary)
-
-            return True, count
-        except Exception:
-            db.session.rollback()
-            logger.exception("Unexpected error during series creation")
-            return False, "Series failed: unexpected error."
+            try:
+                count = cls._bulk_insert_with_audit(user, environment, slots, "create_series")
+                db.session.commit()
+                booking_metrics.booking_created(environment.id, "series", count)
+                logger.info("Created series of %d bookings for user %s", count, user.id)
+
+                # SUMMARY log for the whole series
+                summary = (
+                    f"Created series of {count} bookings in env “{environment.name}” "
+                    f"from {start_date:%Y-%m-%d} "
+                    f"to {end_date:%Y-%m-%d}"
+                )
+                cls.log_action("create_series_summary", user.id, details=summary,
+                               environment_id=environment.id, environment_name=environment.name)
+
+                return True, count
+            except Exception:
+                db.session.rollback()
+                logger.exception("Unexpected error during series creation")
+                return False, "Series failed: unexpected error."
 
     @classmethod
     def attempt_series_booking(cls, user, environment, start_dt, end_dt, weekdays, force=False):
         if force and getattr(user, "role", None) == "admin":
             logger.info("Admin %s forcing series booking %s–%s", user.id, start_dt, end_dt)
-            slots = cls._build_slots(start_dt, end_dt, weekdays)
-            count = cls._bulk_insert_with_audit(user, environment, slots, "forced_series_book")
-            db.session.commit()
+            with environment_lock(environment.id):
+                slots = cls._build_slots(start_dt, end_dt, weekdays)
+                count = cls._bulk_insert_with_audit(user, environment, slots, "forced_series_book")
+                db.session.commit()
+            booking_metrics.booking_created(environment.id, "forced_series", count)
+            booking_metrics.booking_forced(environment.id, "forced_series")
 
             summary = (
                 f"Forced series booking: created {count} bookings in env “{environment.name}” "
                 f"from {start_dt:%Y-%m-%d %H:%M} "
                 f"to {end_dt:%Y-%m-%d %H:%M}"
             )
-            cls.log_action("forced_series_booking_summary", user.id, details=summary)
+            cls.log_action("forced_series_booking_summary", user.id, details=summary,
+                           environment_id=environment.id,
+                           environment_name=environment.name, forced=True)
 
             return True, (count, True)
 
@@ -220,22 +319,179 @@ class BookingService:
         return True, (result, False)
 
     @classmethod
-    def find_suggestion(cls, environment, desired_start, desired_end):
+    def find_suggestions(cls, environment, desired_start, desired_end, limit=None):
+        """
+        Rank alternative slots of the same duration around ``desired_start``.
+
+        Loads the environment's bookings within the suggestion window once,
+        merges them into busy intervals and, for every free gap long enough,
+        picks the start on the ``SUGGESTION_STEP`` grid closest to the desired
+        one (earlier wins ties). Returns up to ``limit`` ``(start, end)`` pairs.
+        """
         duration = desired_end - desired_start
-        for step_mul in range(1, int(cls.SUGGESTION_WINDOW / cls.SUGGESTION_STEP) + 1):
-            for sign in (-1, +1):
-                offset = cls.SUGGESTION_STEP * step_mul * sign
-                cs = desired_start + offset
-                ce = cs + duration
-                if (desired_start - cls.SUGGESTION_WINDOW <= cs <= desired_start + cls.SUGGESTION_WINDOW
-                    and not cls._overlap_exists(environment.id, cs, ce)):
-                    logger.info("Suggestion: %s to %s", cs, ce)
-                    return cs, ce
-        logger.info("No single suggestion found")
-        return None, None
+        max_steps = int(cls.SUGGESTION_WINDOW / cls.SUGGESTION_STEP)
+        window_lo = desired_start - cls.SUGGESTION_WINDOW
+        window_hi = desired_end + cls.SUGGESTION_WINDOW
+        with count_statements() as queries:
+            busy = merge_busy(cls._load_intervals(environment.id, window_lo, window_hi))
+
+        steps = []
+        for gap_start, gap_end in free_gaps(busy, window_lo, window_hi):
+            # grid offsets k * STEP whose slot fits entirely inside the gap
+            k_lo = max(-max_steps, -((desired_start - gap_start) // cls.SUGGESTION_STEP))
+            k_hi = min(max_steps, (gap_end - duration - desired_start) // cls.SUGGESTION_STEP)
+            if k_lo > k_hi:
+                continue
+            if k_hi < 0:
+                steps.append(k_hi)
+            elif k_lo > 0:
+                steps.append(k_lo)
+            else:
+                # the desired slot itself is free here; offer its neighbours
+                steps.extend(k for k in (-1, 1) if k_lo <= k <= k_hi)
+
+        steps.sort(key=lambda k: (abs(k), k))
+        # position of the best offset in the -1, +1, -2, +2, … search order
+        tried = 2 * abs(steps[0]) - (steps[0] < 0) if steps else 2 * max_steps
+        booking_metrics.suggestion_search("single", tried, queries[0], bool(steps))
+        suggestions = [
+            (desired_start + cls.SUGGESTION_STEP * k,
+             desired_start + cls.SUGGESTION_STEP * k + duration)
+            for k in steps[:limit]
+        ]
+        logger.info("Suggestions for env=%s %s–%s: %s",
+                    environment.id, desired_start, desired_end, suggestions)
+        return suggestions
 
     @classmethod
-    def find_series_suggestion(cls, environment, start_date, end_date, weekdays, start_time, end_time):
+    def find_suggestion(cls, environment, desired_start, desired_end):
+        suggestions = cls.find_suggestions(environment, desired_start, desired_end, limit=1)
+        if not suggestions:
+            logger.info("No single suggestion found")
+            return None, None
+        return suggestions[0]
+
+    @classmethod
+    def availability(cls, env_ids, range_start, range_end, duration=None, now=None):
+        """
+        Busy intervals, free gaps and bookable windows of each environment in
+        [range_start, range_end).
+
+        One range query (widened to whole days, for the daily cap) loads every
+        booking of ``env_ids``; each environment is then swept in memory. A
+        bookable window says: a booking may start anywhere in
+        [start, latest_start], must end by ``end`` and may last up to
+        ``max_duration`` (the 8 hour limit and whatever the start day's cap
+        leaves) when starting at ``start``. Windows start no earlier than ``now``. With ``duration`` only
+        windows that fit it are returned, and ``latest_start`` accounts for it.
+        """
+        now = now or datetime.now()
+        day_lo = datetime.combine(range_start.date(), time.min)
+        day_hi = datetime.combine(range_end.date(), time.min) + ONE_DAY
+        rows = db.session.query(
+            Booking.environment_id, Booking.start, Booking.end
+        ).filter(
+            Booking.environment_id.in_(env_ids),
+            Booking.end > day_lo,
+            Booking.start < day_hi,
+        ).all()
+        by_env = {env_id: [] for env_id in env_ids}
+        for env_id, start, end in rows:
+            by_env[env_id].append((start, end))
+
+        cap = 24*3600*cls.DAILY_UTILIZATION_CAP
+        result = {}
+        for env_id, intervals in by_env.items():
+            used_by_day = seconds_by_day(intervals)
+            busy = merge_busy(intervals)
+            free = list(free_gaps(busy, range_start, range_end))
+
+            bookable = []
+            for gap_start, gap_end in free:
+                # the cap is charged to the start day, so cut start ranges at midnight
+                for day, _ in split_by_day(max(gap_start, now), gap_end):
+                    lo = max(gap_start, now, datetime.combine(day, time.min))
+                    hi = min(gap_end, datetime.combine(day, time.min) + ONE_DAY)
+                    max_len = min(cls.MAX_DURATION,
+                                  timedelta(seconds=cap - used_by_day.get(day, 0)),
+                                  gap_end - lo)
+                    need = duration or timedelta(minutes=1)
+                    latest = min(hi - timedelta(minutes=1), gap_end - need)
+                    if max_len < need or latest < lo:
+                        continue
+                    bookable.append({"start": lo, "latest_start": latest,
+                                     "end": gap_end, "max_duration": max_len})
+            result[env_id] = {
+                "busy": [(max(s, range_start), min(e, range_end)) for s, e in busy
+                         if e > range_start and s < range_end],
+                "free": free,
+                "bookable": bookable,
+            }
+        logger.debug("Availability for envs=%s %s–%s: %d bookings scanned",
+                     env_ids, range_start, range_end, len(rows))
+        return result
+
+    @classmethod
+    def find_free_environments(cls, start, end, owner_squad=None):
+        """
+        Every environment (optionally of one squad) with no booking overlapping
+        [start, end) and room under the daily cap for it, least used that day
+        first. One grouped query: environments outer-joined to their clashing
+        bookings and to the start day's usage rollup.
+
+        Returns ``(environment_id, name, used_seconds)`` tuples.
+        """
+        if end <= start or end - start > cls.MAX_DURATION:
+            return []
+        cap = 24*3600*cls.DAILY_UTILIZATION_CAP
+        used = func.coalesce(EnvironmentDailyUsage.booked_seconds, 0)
+        q = (
+            select(Environment.id, Environment.name, used.label("used"))
+            .outerjoin(Booking, and_(Booking.environment_id == Environment.id,
+                                     Booking.end > start, Booking.start < end))
+            .outerjoin(EnvironmentDailyUsage,
+                       and_(EnvironmentDailyUsage.environment_id == Environment.id,
+                            EnvironmentDailyUsage.day == start.date()))
+            .group_by(Environment.id, Environment.name, EnvironmentDailyUsage.booked_seconds)
+            .having(func.count(Booking.id) == 0)
+            .having(used + (end - start).total_seconds() <= cap)
+            .order_by(used, Environment.name)
+        )
+        if owner_squad:
+            q = q.where(Environment.owner_squad == owner_squad)
+        free = [tuple(row) for row in db.session.execute(q)]
+        logger.debug("Free environments for %s–%s squad=%s: %s",
+                     start, end, owner_squad, free)
+        return free
+
+    @classmethod
+    def book_first_free(cls, user, start, end, owner_squad=None):
+        """
+        Book the best candidate of ``find_free_environments``. Each attempt
+        re-validates under that environment's lock, so a candidate taken in the
+        meantime is skipped. Returns the booking, or None if none was free.
+        """
+        for env_id, _, _ in cls.find_free_environments(start, end, owner_squad):
+            environment = db.session.get(Environment, env_id)
+            ok, result = cls.attempt_single_booking(user, environment, start, end)
+            if ok:
+                return result
+            db.session.rollback()
+        return None
+
+    @classmethod
+    def find_series_suggestion(cls, environment, start_date, end_date, weekdays,
+                               start_time, end_time, window=None, step=None):
+        """
+        Find the smallest time shift (earlier first on ties) that makes every
+        day of the series clash-free.
+
+        All bookings touching the series span are fetched in one query and
+        merged; an offsets × days clash matrix is then evaluated with NumPy,
+        so ``window``/``step`` can be wider/finer than the class defaults.
+        """
+        window = window or cls.SUGGESTION_WINDOW
+        step = step or cls.SUGGESTION_STEP
         base_start = datetime.combine(start_date, start_time)
         duration = datetime.combine(start_date, end_time) - base_start
         days = [
@@ -243,19 +499,47 @@ class BookingService:
             for i in range((end_date - start_date).days + 1)
             if str((start_date + timedelta(days=i)).weekday()) in weekdays
         ]
-        for step_mul in range(1, int(cls.SUGGESTION_WINDOW / cls.SUGGESTION_STEP) + 1):
-            for sign in (-1, +1):
-                offset = cls.SUGGESTION_STEP * step_mul * sign
-                for d in days:
-                    cs = datetime.combine(d, start_time) + offset
-                    ce = cs + duration
-                    if cls._overlap_exists(environment.id, cs, ce):
-                        break
-                else:
-                    logger.info("Series suggestion offset %s", offset)
-                    return (base_start + offset).time(), (base_start + offset + duration).time()
-        logger.info("No series suggestion found")
-        return None, None
+        max_steps = int(window / step)
+        if not max_steps:
+            return None, None
+
+        # offsets ordered -1, +1, -2, +2, … (in steps)
+        steps = np.array([k for m in range(1, max_steps + 1) for k in (-m, m)])
+        day_starts = np.array(
+            [datetime.combine(d, start_time) for d in days], dtype="datetime64[s]"
+        ).astype(np.int64)
+        cand_start = day_starts[None, :] + steps[:, None] * int(step.total_seconds())
+        cand_end = cand_start + int(duration.total_seconds())
+
+        busy = []
+        with count_statements() as queries:
+            if days:
+                busy = merge_busy(cls._load_intervals(
+                    environment.id,
+                    datetime.combine(days[0], start_time) - window,
+                    datetime.combine(days[-1], start_time) + window + duration,
+                ))
+        if busy:
+            busy_start = np.array([b[0] for b in busy], dtype="datetime64[s]").astype(np.int64)
+            busy_end = np.array([b[1] for b in busy], dtype="datetime64[s]").astype(np.int64)
+            # busy intervals are disjoint and sorted, so the last one starting
+            # before a candidate's end is the only one that can overlap it
+            last = np.searchsorted(busy_start, cand_end, side="left") - 1
+            clash = (last >= 0) & (busy_end[np.maximum(last, 0)] > cand_start)
+        else:
+            clash = np.zeros(cand_start.shape, dtype=bool)
+        free_rows = np.flatnonzero(~clash.any(axis=1))
+        booking_metrics.suggestion_search(
+            "series", int(free_rows[0]) + 1 if free_rows.size else len(steps),
+            queries[0], bool(free_rows.size),
+        )
+
+        if not free_rows.size:
+            logger.info("No series suggestion found")
+            return None, None
+        offset = step * int(steps[free_rows[0]])
+        logger.info("Series suggestion offset %s", offset)
+        return (base_start + offset).time(), (base_start + offset + duration).time()
 
     @classmethod
     def single_suggestion_flash(cls, environment, desired_start, desired_end):
@@ -274,82 +558,72 @@ class BookingService:
     @classmethod
     def attempt_single_booking(cls, user, environment, start, end,
                                accept_suggestion=False, force=False):
-        if force and getattr(user, "role", None) == "admin":
+        with environment_lock(environment.id):
+            if force and getattr(user, "role", None) == "admin":
+                b = Booking(environment_id=environment.id, user_id=user.id,
+                            start=start, end=end)
+                db.session.add(b)
+                db.session.flush()
+
+                cls.log_action("forced_single_book", user.id, commit=False,
+                               **cls._booking_fields(b.id, environment, start, end, forced=True))
+                db.session.commit()
+                booking_metrics.booking_created(environment.id, "forced_single")
+                booking_metrics.booking_forced(environment.id, "forced_single")
+                return True, b
+
+            ok, err = cls._validate_single(environment.id, start, end)
+            if not ok:
+                if err.startswith("This slot") and not accept_suggestion:
+                    return False, "clash"
+                return False, err
+
             b = Booking(environment_id=environment.id, user_id=user.id,
                         start=start, end=end)
             db.session.add(b)
             db.session.flush()
 
-            msg = (
-                f"Forced booking #{b.id} in env “{environment.name}” "
-                f"from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}"
-            )
-            cls.log_action("forced_single_book", user.id, details=msg, commit=False)
+            action = "accept_suggestion" if accept_suggestion else "create_booking"
+            cls.log_action(action, user.id, commit=False,
+                           **cls._booking_fields(b.id, environment, start, end))
             db.session.commit()
+            booking_metrics.booking_created(environment.id,
+                                            "suggestion" if accept_suggestion else "single")
             return True, b
 
-        ok, err = cls._validate_single(environment.id, start, end)
-        if not ok:
-            if err.startswith("This slot") and not accept_suggestion:
-                return False, "clash"
-            return False, err
-
-        b = Booking(environment_id=environment.id, user_id=user.id,
-                    start=start, end=end)
-        db.session.add(b)
-        db.session.flush()
-
-        action = "accept_suggestion" if accept_suggestion else "create_booking"
-        msg = (
-            f"{action}: booking #{b.id} in env “{environment.name}” "
-            f"from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}, "
-            f"accepted suggestion = {accept_suggestion}"
-        )
-        cls.log_action(action, user.id, details=msg, commit=False)
-        db.session.commit()
-        return True, b
-
     @classmethod
     def attempt_edit_booking(cls, booking, user, environment, start, end, force=False):
-        original = {"start": booking.start, "end": booking.end}
+        previously = f"previously {booking.start:%Y-%m-%d %H:%M}–{booking.end:%Y-%m-%d %H:%M}"
+
+        with environment_lock(booking.environment_id, environment.id):
+            if force and getattr(user, "role", None) == "admin":
+                booking.environment_id = environment.id
+                booking.start = start
+                booking.end = end
+                db.session.flush()
+
+                cls.log_action("forced_edit", user.id, details=previously, commit=False,
+                               **cls._booking_fields(booking.id, environment, start, end, forced=True))
+                db.session.commit()
+                booking_metrics.booking_forced(environment.id, "forced_edit")
+                return True, booking
+
+            ok, err = cls._validate_single(environment.id, start, end, exclude_id=booking.id)
+            if not ok:
+                if err.startswith("This slot"):
+                    return False, "clash"
+                return False, err
 
-        if force and getattr(user, "role", None) == "admin":
             booking.environment_id = environment.id
             booking.start = start
             booking.end = end
             db.session.flush()
 
-            msg = (
-                f"Forced edit of booking #{booking.id} in env “{environment.name}” – "
-                f"from {original['start']:%Y-%m-%d %H:%M}–"
-                f"{original['end']:%Y-%m-%d %H:%M} to "
-                f"{start:%Y-%m-%d %H:%M}–{end:%Y-%m-%d %H:%M}"
-            )
-            cls.log_action("forced_edit", user.id, details=msg, commit=False)
+            cls.log_action("edit_booking", user.id, details=previously, commit=False,
+                           **cls._booking_fields(booking.id, environment, start, end))
             db.session.commit()
             return True, booking
 
-        ok, err = cls._validate_single(environment.id, start, end, exclude_id=booking.id)
-        if not ok:
-            if err.startswith("This slot"):
-                return False, "clash"
-            return False, err
-
-        booking.environment_id = environment.id
-        booking.start = start
-        booking.end = end
-        db.session.flush()
-
-        msg = (
-            f"Edited booking #{booking.id} in env “{environment.name}” – "
-            f"from {original['start']:%Y-%m-%d %H:%M}–"
-            f"{original['end']:%Y-%m-%d %H:%M} to "
-            f"{start:%Y-%m-%d %H:%M}–{end:%Y-%m-%d %H:%M}"
-        )
-        cls.log_action("edit_booking", user.id, details=msg, commit=False)
-        db.session.commit()
-        return True, booking
-
     @classmethod
     def series_suggestion_context(cls, form, env, start_dt, end_dt):
         s, e = cls.find_series_suggestion(
@@ -420,14 +694,10 @@ class BookingService:
     def generate_ics_response(cls, booking):
         now_utc = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
         lines = [
-            "BEGIN:VCALENDAR", "VERSION:2.0",
-            "PRODID:-//EasyEnvBooker//EN", "BEGIN:VEVENT",
-            f"UID:booking-{booking.id}@easyenvbooker.local",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART:{booking.start.strftime('%Y%m%dT%H%M%S')}",
-            f"DTEND:{booking.end.strftime('%Y%m%dT%H%M%S')}",
-            f"SUMMARY:Booking for {booking.environment.name}",
-            "END:VEVENT", "END:VCALENDAR", ""
+            "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//EasyEnvBooker//EN",
+            *feeds.event_lines(booking.id, booking.start, booking.end,
+                               booking.environment.name, now_utc),
+            "END:VCALENDAR", ""
         ]
         payload = "\r\n".join(lines)
         headers = {
@@ -0,0 +1,116 @@
+"""
+Maintained ``(environment_id, day) → booked_seconds`` rollup.
+
+Every ORM insert, update and delete of a ``Booking`` adjusts the rollup in the
+same transaction (bookings spanning midnight are split per day), so the daily
+cap check is a primary-key lookup on any database dialect. Writes that bypass
+the ORM unit of work must call ``apply_booking`` themselves.
+"""
+import logging
+from collections import defaultdict
+from sqlalchemy import bindparam, delete, event, inspect, insert, select, update
+from app import db
+from app.models import Booking, EnvironmentDailyUsage
+from app.bookings.intervals import seconds_by_day, split_by_day
+
+logger = logging.getLogger(__name__)
+
+_usage = EnvironmentDailyUsage.__table__
+
+
+def apply_booking(connection, env_id, start, end, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one booking's seconds."""
+    for day, secs in split_by_day(start, end):
+        delta = sign * round(secs)
+        result = connection.execute(
+            update(_usage)
+            .where(_usage.c.environment_id == env_id, _usage.c.day == day)
+            .values(booked_seconds=_usage.c.booked_seconds + delta)
+        )
+        if not result.rowcount:
+            connection.execute(insert(_usage).values(
+                environment_id=env_id, day=day, booked_seconds=delta
+            ))
+
+
+def apply_many(connection, env_id, intervals):
+    """Add many new bookings of one environment with three statements."""
+    deltas = {day: round(secs) for day, secs in seconds_by_day(intervals).items()}
+    if not deltas:
+        return
+    existing = set(connection.execute(
+        select(_usage.c.day).where(
+            _usage.c.environment_id == env_id, _usage.c.day.in_(list(deltas))
+        )
+    ).scalars())
+    if existing:
+        connection.execute(
+            update(_usage)
+            .where(_usage.c.environment_id == env_id,
+                   _usage.c.day == bindparam("b_day"))
+            .values(booked_seconds=_usage.c.booked_seconds + bindparam("b_delta")),
+            [{"b_day": day, "b_delta": deltas[day]} for day in existing]
+        )
+    missing = [day for day in deltas if day not in existing]
+    if missing:
+        connection.execute(insert(_usage), [
+            {"environment_id": env_id, "day": day, "booked_seconds": deltas[day]}
+            for day in missing
+        ])
+
+
+def used_seconds(env_id, day):
+    """Booked seconds for ``env_id`` on ``day`` (autoflushes pending bookings)."""
+    return db.session.query(EnvironmentDailyUsage.booked_seconds).filter(
+        EnvironmentDailyUsage.environment_id == env_id,
+        EnvironmentDailyUsage.day == day
+    ).scalar() or 0
+
+
+def rebuild(batch_size=1000):
+    """Recompute the whole rollup from ``bookings``; returns the row count."""
+    _usage.create(db.engine, checkfirst=True)
+    totals = defaultdict(float)
+    rows = db.session.execute(
+        select(Booking.environment_id, Booking.start, Booking.end)
+        .execution_options(yield_per=batch_size)
+    )
+    for env_id, start, end in rows:
+        for day, secs in split_by_day(start, end):
+            totals[env_id, day] += secs
+
+    db.session.execute(delete(_usage))
+    if totals:
+        db.session.execute(insert(_usage), [
+            {"environment_id": env_id, "day": day, "booked_seconds": round(secs)}
+            for (env_id, day), secs in totals.items()
+        ])
+    db.session.commit()
+    logger.info("Rebuilt daily usage rollup: %d rows", len(totals))
+    return len(totals)
+
+
+def _old_value(state, attr):
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(state.obj(), attr)
+
+
+@event.listens_for(Booking, "after_insert")
+def _booking_inserted(mapper, connection, target):
+    apply_booking(connection, target.environment_id, target.start, target.end)
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[a].history.has_changes()
+               for a in ("environment_id", "start", "end")):
+        return
+    apply_booking(connection, _old_value(state, "environment_id"),
+                  _old_value(state, "start"), _old_value(state, "end"), sign=-1)
+    apply_booking(connection, target.environment_id, target.start, target.end)
+
+
+@event.listens_for(Booking, "after_delete")
+def _booking_deleted(mapper, connection, target):
+    apply_booking(connection, target.environment_id, target.start, target.end, sign=-1)
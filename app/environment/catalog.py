@@ -0,0 +1,97 @@
+"""
+Process-level cache of the environment catalog.
+
+Environments change a few times a week but are listed on every booking form,
+so each worker process keeps an immutable snapshot of them (sorted by name)
+plus the distinct owner squads. Freshness is tracked with a version counter
+in the ``cache_versions`` table: every insert, update or delete of an
+``Environment`` bumps it in the same transaction, and each request compares
+it with the snapshot's version once (a primary-key lookup) before using it.
+
+With ``ENV_CATALOG_CACHE`` off every request loads a fresh snapshot.
+"""
+import logging
+import threading
+from collections import namedtuple
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select
+from app import db
+from app.models import Environment
+from app.versions import bump_version, current_version
+
+logger = logging.getLogger(__name__)
+
+CATALOG_KEY = "environments"
+
+CatalogEntry = namedtuple(
+    "CatalogEntry", "id name owner_squad created_at created_by_email"
+)
+
+
+class Snapshot(namedtuple("Snapshot", "version environments squads")):
+    """One consistent view of the catalog."""
+
+    def choices(self):
+        """``(id, name)`` pairs for a SelectField."""
+        return [(e.id, e.name) for e in self.environments]
+
+    def get(self, env_id):
+        return next((e for e in self.environments if e.id == env_id), None)
+
+
+def load_snapshot(version):
+    environments = tuple(
+        CatalogEntry(*row) for row in db.session.execute(
+            select(Environment.id, Environment.name, Environment.owner_squad,
+                   Environment.created_at, Environment.created_by_email)
+            .order_by(Environment.name)
+        )
+    )
+    squads = tuple(sorted({e.owner_squad for e in environments}))
+    return Snapshot(version, environments, squads)
+
+
+class EnvironmentCatalog:
+    """The latest snapshot this process has seen, replaced when the version moves."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def snapshot(self):
+        version = current_version(CATALOG_KEY)
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+        # read after the version, so a concurrent bump only causes a spare reload
+        snap = load_snapshot(version)
+        with self._lock:
+            self._snapshot = snap
+            self.reloads += 1
+        logger.debug("Environment catalog reloaded at version %s (%d envs)",
+                     version, len(snap.environments))
+        return snap
+
+
+def init_app(app):
+    if app.config.get("ENV_CATALOG_CACHE"):
+        app.extensions["environment_catalog"] = EnvironmentCatalog()
+
+
+def environment_catalog():
+    """This request's catalog snapshot; the version is checked once per request."""
+    if "environment_catalog" not in g:
+        catalog = current_app.extensions.get("environment_catalog")
+        g.environment_catalog = catalog.snapshot() if catalog else load_snapshot(None)
+    return g.environment_catalog
+
+
+@event.listens_for(Environment, "after_insert")
+@event.listens_for(Environment, "after_update")
+@event.listens_for(Environment, "after_delete")
+def _environment_changed(mapper, connection, target):
+    bump_version(connection, CATALOG_KEY)
+    # this request's snapshot is stale now too
+    if has_app_context():
+        g.pop("environment_catalog", None)
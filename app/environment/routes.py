@@ -2,8 +2,10 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from app.auth.decorators import admin_required
 from app import db
-from app.models import AuditLog, Booking, Environment
+from app.models import Booking, Environment
+from app.audit.service import AuditService
 from app.environment.forms import EnvironmentForm, DeleteForm
+from app.environment.catalog import environment_catalog
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,32 +17,19 @@ env_bp = Blueprint("environment", __name__, url_prefix="/environments")
 @admin_required
 def list_environments():
     """Display list of all environments for admin users, with stats."""
-    # 1) the full list, alphabetically
-    all_envs = Environment.query.order_by(Environment.name).all()
-
-    # 2) stats for the cards
-    total_envs     = Environment.query.count()
+    # the list (alphabetical) and distinct squads come from the cached catalog
+    catalog = environment_catalog()
     total_bookings = Booking.query.count()
 
-    # 3) distinct owner squads for the filter dropdown
-    squads = [
-        row[0]
-        for row in db.session
-                       .query(Environment.owner_squad)
-                       .distinct()
-                       .order_by(Environment.owner_squad)
-                       .all()
-    ]
-
     delete_form = DeleteForm()
 
     return render_template(
         "environment/list.html",
-        environments=all_envs,
+        environments=catalog.environments,
         delete_form=delete_form,
-        total_envs=total_envs,
+        total_envs=len(catalog.environments),
         total_bookings=total_bookings,
-        squads=squads,
+        squads=catalog.squads,
     )
 
 @env_bp.route("/new", methods=["GET", "POST"])
@@ -56,16 +45,14 @@ def create_environment():
             created_by_email=current_user.email
         )
         db.session.add(env)
+        db.session.flush()
         msg = (
              f"Created environment “{env.name}”, "
              f"owned by squad “{env.owner_squad}” "
              f"via user {current_user.email}"
              )
-        db.session.add(AuditLog(
-             action="create_environment",
-             actor_id=current_user.id,
-             details=msg
-         ))
+        AuditService.record("create_environment", current_user.id, details=msg,
+                            commit=False, environment_id=env.id, environment_name=env.name)
         db.session.commit()
 
         logger.info(f"Environment '{env.name}' created by {current_user.email}")
@@ -99,11 +86,8 @@ def edit_environment(env_id):
              f"Updated environment “{env.name}” (ID {env.id}): "
                "; ".join(changes)
          )
-        db.session.add(AuditLog(
-             action="update_environment",
-             actor_id=current_user.id,
-             details=msg
-         ))
+        AuditService.record("update_environment", current_user.id, details=msg,
+                            commit=False, environment_id=env.id, environment_name=env.name)
 
         db.session.commit()
         logger.info(f"Environment '{env.name}' updated by {current_user.email}")
@@ -136,11 +120,8 @@ def delete_environment(env_id):
         f"Deleted environment “{env.name}” (ID {env.id}) "
         f"by user {current_user.email}"
     )
-    db.session.add(AuditLog(
-        action="delete_environment",
-        actor_id=current_user.id,
-        details=msg
-    ))
+    AuditService.record("delete_environment", current_user.id, details=msg,
+                        commit=False, environment_id=env.id, environment_name=env.name)
     db.session.delete(env)
     db.session.commit()
 
@@ -0,0 +1,75 @@
+"""
+Index management for databases created before an index was declared.
+
+``db.create_all`` only creates indexes together with their table, so
+``ensure_indexes`` adds every index declared on the models that an existing
+database lacks. ``explain_hot_queries`` runs the dialect's EXPLAIN on the
+queries the indexes exist for, to check they are actually used.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app import db
+from app.models import AuditLog, Booking
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_indexes():
+    """Create declared indexes missing from the database; returns their names."""
+    inspector = inspect(db.engine)
+    created = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+                    logger.info("Created index %s on %s", index.name, table.name)
+    return created
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN`` (``EXPLAIN QUERY PLAN`` on SQLite) of a select."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN" if compiler.dialect.name == "sqlite" else "EXPLAIN"
+    return f"{prefix} {compiler.process(element.stmt, **kw)}"
+
+
+def hot_queries(now=None):
+    """``(label, select)`` pairs for the queries the indexes are meant for."""
+    now = now or datetime.utcnow()
+    return [
+        ("overlap check", select(Booking.id).where(
+            Booking.environment_id == 1, Booking.end > now, Booking.start < now).limit(1)),
+        ("my upcoming bookings", select(Booking.id).where(
+            Booking.user_id == 1, Booking.start >= now)
+            .order_by(Booking.start, Booking.id).limit(50)),
+        ("all upcoming bookings", select(Booking.id).where(Booking.start >= now)
+            .order_by(Booking.start, Booking.id).limit(50)),
+        ("my activity", select(AuditLog.id).where(AuditLog.actor_id == 1)
+            .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(50)),
+        ("recent activity", select(AuditLog.id)
+            .order_by(AuditLog.timestamp.desc()).limit(5)),
+    ]
+
+
+def explain_hot_queries(now=None):
+    """``(label, plan rows)`` for every hot query, as the database reports them."""
+    return [
+        (label, [tuple(row) for row in db.session.execute(Explain(stmt))])
+        for label, stmt in hot_queries(now)
+    ]
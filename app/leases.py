@@ -0,0 +1,78 @@
+"""
+Job leases stored in ``job_leases``.
+
+A process that wants to run a background job claims the job's row until
+``expires_at``; other processes (every web worker and CLI invocation runs the
+same scheduler) skip the run while someone else holds an unexpired lease. A
+holder that crashes just lets the lease run out; a long run keeps its lease by
+calling ``renew`` between units of work.
+"""
+import os
+import socket
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import JobLease
+
+_table = JobLease.__table__
+
+_INSTANCE = uuid.uuid4().hex[:8]
+
+
+def holder():
+    """This process's holder id; read at call time, so forked workers differ by pid."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_INSTANCE}"
+
+
+def acquire(name, duration, now=None):
+    """Claim ``name`` for ``duration``; True if this process now holds it."""
+    now = now or datetime.utcnow()
+    expires = now + duration
+    me = holder()
+    result = db.session.execute(
+        update(_table)
+        .where(_table.c.name == name,
+               or_(_table.c.expires_at <= now, _table.c.holder == me))
+        .values(holder=me, expires_at=expires)
+    )
+    if result.rowcount:
+        db.session.commit()
+        return True
+    try:
+        db.session.execute(insert(_table).values(name=name, holder=me, expires_at=expires))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()  # held by someone else
+        return False
+
+
+def renew(name, duration, now=None):
+    """Push our lease on ``name`` out to ``duration`` from now; False if it was lost."""
+    now = now or datetime.utcnow()
+    result = db.session.execute(
+        update(_table)
+        .where(_table.c.name == name, _table.c.holder == holder())
+        .values(expires_at=now + duration)
+    )
+    db.session.commit()
+    return bool(result.rowcount)
+
+
+def release(name):
+    db.session.execute(delete(_table).where(_table.c.name == name, _table.c.holder == holder()))
+    db.session.commit()
+
+
+@contextmanager
+def lease(name, duration):
+    """``with lease(...) as held:`` runs the body only meaningfully when ``held``."""
+    held = acquire(name, duration)
+    try:
+        yield held
+    finally:
+        if held:
+            release(name)
@@ -0,0 +1,229 @@
+"""
+Dashboard aggregates with a short-lived, process-local cache.
+
+Every admin sees the same dashboard, so admins share one cache entry; regular
+users get one entry each. Entries expire after ``DASHBOARD_CACHE_TTL``
+seconds and are dropped as soon as a transaction that changed a booking (its
+owner's entry and the admin entry) or an environment (every entry) commits.
+The TTL only has to cover what no write announces: time moving on.
+
+Cached values are plain dicts, never ORM instances, so they can be shared
+across requests and sessions.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, time as dt_time
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, joinedload
+from app import db
+from app.bookings.intervals import ONE_DAY, seconds_by_day
+from app.models import AuditLog, Booking, Environment, EnvironmentDailyUsage
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "dashboard_stats_keys"
+ADMIN_KEY = "admin"
+ALL = object()
+
+
+class StatsCache:
+    """Thread-safe TTL cache with hit/miss counters."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # computed outside the lock; two concurrent misses just both compute
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, keys=ALL):
+        with self._lock:
+            if keys is ALL:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+def init_app(app):
+    ttl = app.config.get("DASHBOARD_CACHE_TTL", 0)
+    if ttl:
+        app.extensions["dashboard_cache"] = StatsCache(ttl)
+
+
+def stats_cache():
+    """The current app's cache, or None when it is disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("dashboard_cache")
+
+
+def cache_key(user):
+    return ADMIN_KEY if user.role == "admin" else ("user", user.id)
+
+
+def dashboard_stats(user):
+    """The dashboard aggregates for ``user``, from the cache when possible."""
+    cache = stats_cache()
+    if cache is None:
+        return compute_stats(user)
+    return cache.get_or_compute(cache_key(user), lambda: compute_stats(user))
+
+
+def compute_stats(user):
+    """Build the dashboard aggregates in at most four queries."""
+    now = datetime.utcnow()
+    is_admin = user.role == "admin"
+    upcoming_filter = [Booking.start >= now]
+    if not is_admin:
+        upcoming_filter.append(Booking.user_id == user.id)
+
+    # 1. counts in one round trip (admins count all environments instead)
+    columns = [func.count(Booking.id)]
+    if is_admin:
+        columns.append(select(func.count(Environment.id)).scalar_subquery())
+    else:
+        columns.append(func.count(Booking.environment_id.distinct()))
+    upcoming_count, env_count = db.session.execute(
+        select(*columns).where(*upcoming_filter)
+    ).one()
+
+    # 2. next five bookings with their environment and user
+    upcoming = [
+        {
+            "id": b.id,
+            "environment": b.environment.name,
+            "user": b.user.email,
+            "start": b.start,
+            "end": b.end,
+        }
+        for b in (
+            Booking.query
+            .options(joinedload(Booking.environment), joinedload(Booking.user))
+            .filter(*upcoming_filter)
+            .order_by(Booking.start, Booking.id)
+            .limit(5)
+        )
+    ]
+
+    # 3. hours booked today, clipped to today like the usage rollup: the
+    #    rollup itself for admins, the user's own bookings otherwise
+    today = now.date()
+    if is_admin:
+        secs = db.session.scalar(
+            select(func.coalesce(func.sum(EnvironmentDailyUsage.booked_seconds), 0))
+            .where(EnvironmentDailyUsage.day == today)
+        )
+    else:
+        day_start = datetime.combine(today, dt_time.min)
+        # summed in Python so it works on every database dialect
+        secs = seconds_by_day(
+            db.session.execute(
+                select(Booking.start, Booking.end).where(
+                    Booking.user_id == user.id,
+                    Booking.end > day_start,
+                    Booking.start < day_start + ONE_DAY,
+                )
+            )
+        )[today]
+
+    # 4. recent activity (admin only)
+    activity = []
+    if is_admin:
+        activity = [
+            {"timestamp": log.timestamp, "message": log.message}
+            for log in (
+                AuditLog.query
+                .options(joinedload(AuditLog.environment))
+                .order_by(AuditLog.timestamp.desc())
+                .limit(5)
+            )
+        ]
+
+    return {
+        "upcoming": upcoming,
+        "upcoming_count": upcoming_count,
+        "env_count": env_count,
+        "hours_today": round(secs / 3600, 1),
+        "activity": activity,
+    }
+
+
+# ── invalidation ─────────────────────────────────────────────────────────────
+
+def queue_invalidation(session, *user_ids):
+    """Drop the entries of ``user_ids`` (and the admin entry) when ``session`` commits."""
+    if stats_cache() is None:
+        return
+    keys = session.info.setdefault(_PENDING_KEY, set())
+    if ALL in keys:
+        return
+    keys.add(ADMIN_KEY)
+    keys.update(("user", uid) for uid in user_ids)
+
+
+def _queue_all(session):
+    if stats_cache() is not None:
+        session.info[_PENDING_KEY] = {ALL}
+
+
+@event.listens_for(Booking, "after_insert")
+@event.listens_for(Booking, "after_delete")
+def _booking_changed(mapper, connection, target):
+    queue_invalidation(inspect(target).session, target.user_id)
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    history = inspect(target).attrs.user_id.history
+    queue_invalidation(inspect(target).session, target.user_id, *history.deleted)
+
+
+@event.listens_for(Environment, "after_insert")
+@event.listens_for(Environment, "after_update")
+@event.listens_for(Environment, "after_delete")
+def _environment_changed(mapper, connection, target):
+    _queue_all(inspect(target).session)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    cache = stats_cache()
+    if keys and cache is not None:
+        cache.invalidate(ALL if ALL in keys else keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
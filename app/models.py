@@ -34,6 +34,14 @@ class Environment(db.Model):
 
 class Booking(db.Model):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # overlap checks and range reads of one environment
+        db.Index("ix_bookings_env_start_end", "environment_id", "start", "end"),
+        # a user's upcoming bookings, soonest first
+        db.Index("ix_bookings_user_start", "user_id", "start"),
+        # everyone's upcoming bookings (admin list, dashboard)
+        db.Index("ix_bookings_start", "start"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     environment_id = db.Column(
         db.Integer, db.ForeignKey("environments.id"), nullable=False
@@ -46,8 +54,39 @@ class Booking(db.Model):
     user = db.relationship("User", backref="bookings")
 
 
+class EnvironmentDailyUsage(db.Model):
+    """Booked seconds per environment per calendar day (maintained rollup)."""
+    __tablename__ = "environment_daily_usage"
+    environment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    booked_seconds = db.Column(db.Integer, default=0, nullable=False)
+
+
+class CacheVersion(db.Model):
+    """Named counters bumped on writes so every process can spot stale caches."""
+    __tablename__ = "cache_versions"
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, nullable=False)
+
+
+class JobLease(db.Model):
+    """Time-limited claim on a background job, so one process runs it at a time."""
+    __tablename__ = "job_leases"
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
 class AuditLog(db.Model):
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # keyset pagination of a user's activity: newest first, id as tiebreaker
+        db.Index("ix_audit_log_actor_timestamp_id", "actor_id", "timestamp", "id"),
+        # recent activity across all users (dashboard, export, retention)
+        db.Index("ix_audit_log_timestamp", "timestamp"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     action = db.Column(db.String(50), nullable=False)
     actor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -56,3 +95,51 @@ class AuditLog(db.Model):
     # Optional extra information (e.g. environment name, IP, etc.)
     details = db.Column(db.Text, nullable=True)
 
+    # Structured, indexed fields. No FK constraints: entries must outlive the
+    # bookings and environments they describe.
+    booking_id = db.Column(db.Integer, index=True, nullable=True)
+    environment_id = db.Column(db.Integer, index=True, nullable=True)
+    # name at the time of the action, so renames and deletions keep the trail
+    environment_name = db.Column(db.String(100), nullable=True)
+    start = db.Column(db.DateTime, nullable=True)
+    end = db.Column(db.DateTime, nullable=True)
+    forced = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+
+    environment = db.relationship(
+        "Environment",
+        primaryjoin="foreign(AuditLog.environment_id) == Environment.id",
+        viewonly=True,
+    )
+
+    BOOKING_MESSAGES = {
+        "create_booking":     "Created booking #{id} in env “{env}” from {start} to {end}",
+        "accept_suggestion":  "Created suggested booking #{id} in env “{env}” from {start} to {end}",
+        "forced_single_book": "Forced booking #{id} in env “{env}” from {start} to {end}",
+        "create_series":      "booking #{id} in env “{env}” from {start} to {end}",
+        "forced_series_book": "booking #{id} in env “{env}” from {start} to {end}",
+        "edit_booking":       "Edited booking #{id} in env “{env}” to {start}–{end}",
+        "forced_edit":        "Forced edit of booking #{id} in env “{env}” to {start}–{end}",
+        "delete_booking":     "Deleted booking #{id} in env “{env}” from {start} to {end}",
+    }
+
+    @property
+    def message(self):
+        """Human-readable text, rendered from the structured fields when set."""
+        return self.render_message(
+            self.action, self.details, self.booking_id, self.environment_id,
+            self.environment_name or (self.environment.name if self.environment else None),
+            self.start, self.end,
+        )
+
+    @classmethod
+    def render_message(cls, action, details, booking_id, environment_id,
+                       environment_name, start, end):
+        template = cls.BOOKING_MESSAGES.get(action)
+        # partially backfilled entries may lack the times; keep their text
+        if template is None or booking_id is None or start is None or end is None:
+            return details
+        text = template.format(
+            id=booking_id, env=environment_name or f"#{environment_id}",
+            start=f"{start:%Y-%m-%d %H:%M}", end=f"{end:%Y-%m-%d %H:%M}",
+        )
+        return f"{text} ({details})" if details else text
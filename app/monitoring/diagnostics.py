@@ -0,0 +1,140 @@
+"""
+Slow-query log and N+1 detector for development and staging.
+
+Two independent checks, both off unless configured:
+
+* ``SLOW_QUERY_MS``: any statement slower than this is logged with its
+  parameters and the application frames that issued it.
+* ``N_PLUS_ONE_THRESHOLD``: a request that runs the same statement shape
+  (the SQL text with IN-lists collapsed) more than this many times is logged
+  as a probable N+1, e.g. a template lazy-loading ``b.environment`` per row.
+
+Every finding is also kept as a ``Violation`` on the app; with
+``QUERY_DIAGNOSTICS_STRICT`` the test suite fails any test that produced one.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter, namedtuple
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+Violation = namedtuple("Violation", "kind statement detail origin")
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IN_LIST_RE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%s\s*,)+\s*%s\s*\)")
+_MAX_PARAMS_LEN = 500
+_listening = False
+
+
+class QueryDiagnostics:
+    def __init__(self, slow_ms=0, n_plus_one=0):
+        self.slow_ms = slow_ms
+        self.n_plus_one = n_plus_one
+        self.violations = []
+        self._lock = threading.Lock()
+
+    def record(self, violation):
+        with self._lock:
+            self.violations.append(violation)
+
+    def clear(self):
+        with self._lock:
+            self.violations.clear()
+
+
+def init_app(app):
+    slow_ms = app.config.get("SLOW_QUERY_MS", 0)
+    n_plus_one = app.config.get("N_PLUS_ONE_THRESHOLD", 0)
+    if not (slow_ms or n_plus_one):
+        return
+    app.extensions["query_diagnostics"] = QueryDiagnostics(slow_ms, n_plus_one)
+    if n_plus_one:
+        app.before_request(_start_request)
+        app.after_request(_check_request)
+    _listen()
+
+
+def query_diagnostics():
+    """The current app's diagnostics, or None when none are configured."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("query_diagnostics")
+
+
+def statement_shape(statement):
+    """The statement with expanded IN-lists collapsed, so their length doesn't matter."""
+    return _IN_LIST_RE.sub("(?...)", " ".join(statement.split()))
+
+
+def origin():
+    """The innermost application frames on the stack, outside this module."""
+    frames = [
+        f for f in traceback.extract_stack()
+        if f.filename.startswith(_APP_DIR) and f.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames[-6:]))
+
+
+# ── N+1 detection ────────────────────────────────────────────────────────────
+
+def _start_request():
+    g.query_shapes = Counter()
+    g.query_origins = {}
+
+
+def _check_request(response):
+    shapes = g.pop("query_shapes", None)
+    diagnostics = query_diagnostics()
+    if not shapes or diagnostics is None:
+        return response
+    endpoint = request.url_rule.endpoint if request.url_rule else request.path
+    for shape, count in shapes.items():
+        if count > diagnostics.n_plus_one:
+            where = g.query_origins.get(shape, "")
+            logger.warning("Possible N+1 in %s: %d× %s\n%s", endpoint, count, shape, where)
+            diagnostics.record(Violation("n+1", shape, f"{endpoint}: {count} executions", where))
+    return response
+
+
+# ── statement hooks ──────────────────────────────────────────────────────────
+
+def _listen():
+    global _listening
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._diagnostics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    diagnostics = query_diagnostics()
+    started = getattr(context, "_diagnostics_started", None)
+    if diagnostics is None or started is None:
+        return
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if diagnostics.slow_ms and elapsed_ms > diagnostics.slow_ms:
+        params = repr(parameters)[:_MAX_PARAMS_LEN]
+        where = origin()
+        logger.warning("Slow query (%.0f ms): %s\nparameters: %s\n%s",
+                       elapsed_ms, statement, params, where)
+        diagnostics.record(Violation("slow", statement, f"{elapsed_ms:.0f} ms, {params}", where))
+
+    if has_request_context() and "query_shapes" in g:
+        shape = statement_shape(statement)
+        g.query_shapes[shape] += 1
+        # the stack is only worth capturing once the shape starts repeating
+        if g.query_shapes[shape] == diagnostics.n_plus_one + 1:
+            g.query_origins[shape] = origin()
@@ -0,0 +1,174 @@
+"""
+Per-request timing and SQL instrumentation, rendered in Prometheus text format.
+
+Every request records its latency, response status, and the number and total
+duration of the SQL statements it ran (counted by ``before_cursor_execute`` /
+``after_cursor_execute`` listeners into ``g``). The figures are folded into a
+process-wide registry under one lock, once per request, and served at
+``/metrics``. Each worker process aggregates on its own; Prometheus sums the
+workers. Streamed responses are timed until the response object is returned,
+not until the last chunk is sent.
+
+``METRICS_ENABLED = False`` turns the hooks off.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# open ``count_statements`` blocks of the current thread / task
+_statement_counters = ContextVar("statement_counters", default=())
+
+
+class Histogram:
+    """Cumulative-on-render bucket counts plus sum and count (not thread-safe)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for le, n in zip((*self.buckets, "+Inf"), self.counts):
+            total += n
+            yield le, total
+
+
+class Metrics:
+    """The per-process registry; ``observe_request`` is the only writer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.query_time = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+
+    def observe_request(self, endpoint, method, status, seconds, query_count, query_seconds):
+        with self._lock:
+            self.requests[endpoint, method, status] += 1
+            self.latency[endpoint].observe(seconds)
+            self.queries[endpoint].observe(query_count)
+            self.query_time[endpoint].observe(query_seconds)
+
+    def render(self):
+        """The registry in Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests by endpoint, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}")
+            _histogram_lines(lines, "http_request_duration_seconds",
+                             "Request latency by endpoint.", self.latency)
+            _histogram_lines(lines, "db_queries_per_request",
+                             "SQL statements executed per request.", self.queries)
+            _histogram_lines(lines, "db_query_duration_seconds_per_request",
+                             "Total SQL time per request.", self.query_time)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(lines, name, help_text, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for endpoint, hist in sorted(histograms.items()):
+        for le, n in hist.cumulative():
+            lines.append(f"{name}_bucket{_labels(endpoint=endpoint, le=le)} {n}")
+        lines.append(f"{name}_sum{_labels(endpoint=endpoint)} {hist.sum:.6f}")
+        lines.append(f"{name}_count{_labels(endpoint=endpoint)} {hist.count}")
+
+
+# ── hooks ────────────────────────────────────────────────────────────────────
+
+def init_app(app):
+    if not app.config.get("METRICS_ENABLED"):
+        return
+    app.extensions["metrics"] = Metrics()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def metrics():
+    """The current app's registry, or None when metrics are disabled."""
+    return current_app.extensions.get("metrics")
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.query_count = 0
+    g.query_seconds = 0.0
+
+
+def _finish_request(response):
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        # unmatched URLs share one label to keep the series count bounded
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        metrics().observe_request(endpoint, request.method, response.status_code,
+                                  time.perf_counter() - start,
+                                  g.query_count, g.query_seconds)
+    return response
+
+
+def request_queries():
+    """``(count, seconds)`` of SQL run so far by this request, None outside one."""
+    if has_request_context() and "metrics_start" in g:
+        return g.query_count, g.query_seconds
+    return None
+
+
+@contextmanager
+def count_statements():
+    """Count the SQL statements executed inside the block: ``with ... as n: ...; n[0]``."""
+    counter = [0]
+    token = _statement_counters.set(_statement_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _statement_counters.reset(token)
+
+
+# Start times live on the execution context, so a failed statement leaves nothing behind.
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in _statement_counters.get():
+        counter[0] += 1
+    started = getattr(context, "_metrics_started", None)
+    if started is not None and has_request_context() and "metrics_start" in g:
+        g.query_count += 1
+        g.query_seconds += time.perf_counter() - started
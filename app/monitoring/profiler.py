@@ -0,0 +1,184 @@
+"""
+On-demand ``cProfile`` of single requests, for admins.
+
+A request carrying a valid profile token (``?_profile=<token>`` or an
+``X-Profile: <token>`` header) from the admin it was issued to runs under
+``cProfile``. Its raw stats (``.prof``, for ``pstats``/snakeviz) and a text
+summary (hottest functions plus a call tree) are written to
+``PROFILE_DIR``, which keeps the newest ``PROFILE_KEEP`` profiles. Tokens
+are signed and expire after ``PROFILE_TOKEN_MAX_AGE`` seconds.
+
+Requests without a token only pay for one dict lookup.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from flask import current_app, g, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+PARAM = "_profile"
+HEADER = "X-Profile"
+TOP_FUNCTIONS = 40
+TREE_MIN_SHARE = 0.01  # call-tree branches below 1% of the total are cut
+TREE_MAX_DEPTH = 25
+
+_NAME_RE = re.compile(r"^\d{8}T\d{6}\d{6}-[\w.-]+$")
+
+
+def init_app(app):
+    if app.config.get("PROFILING_ENABLED"):
+        app.before_request(_start_profile)
+        app.after_request(_finish_profile)
+
+
+def profile_dir():
+    return current_app.config["PROFILE_DIR"]
+
+
+# ── tokens ───────────────────────────────────────────────────────────────────
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="request-profile")
+
+
+def profile_token(user_id):
+    return _serializer().dumps(user_id)
+
+
+def _token_user(token):
+    try:
+        return _serializer().loads(token, max_age=current_app.config["PROFILE_TOKEN_MAX_AGE"])
+    except BadSignature:
+        return None
+
+
+def _wants_profile():
+    token = request.args.get(PARAM) or request.headers.get(HEADER)
+    if not token:
+        return False
+    user_id = _token_user(token)
+    return (user_id is not None and current_user.is_authenticated
+            and current_user.role == "admin" and current_user.id == user_id)
+
+
+# ── hooks ────────────────────────────────────────────────────────────────────
+
+def _start_profile():
+    if PARAM not in request.args and HEADER not in request.headers:
+        return
+    if not _wants_profile():
+        logger.warning("Rejected profile token on %s", request.path)
+        return
+    g.profiler = cProfile.Profile()
+    g.profile_started = time.perf_counter()
+    g.profiler.enable()
+
+
+def _finish_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    elapsed = time.perf_counter() - g.pop("profile_started")
+    name = save_profile(profiler, elapsed, response.status_code)
+    response.headers["X-Profile-Name"] = name
+    return response
+
+
+# ── storage ──────────────────────────────────────────────────────────────────
+
+def save_profile(profiler, elapsed, status):
+    """Write ``<name>.prof`` and ``<name>.txt``, rotate, and return ``name``."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}"
+    path = os.path.join(directory, name)
+
+    profiler.dump_stats(path + ".prof")
+    header = (f"{request.method} {request.full_path.rstrip('?')} → {status}\n"
+              f"user {current_user.email}, {elapsed * 1000:.1f} ms wall\n")
+    with open(path + ".txt", "w", encoding="utf-8") as fh:
+        fh.write(header + "\n" + summarize(pstats.Stats(profiler)))
+    _rotate(directory, current_app.config["PROFILE_KEEP"])
+    logger.info("Profiled %s %s in %.1f ms → %s",
+                request.method, request.path, elapsed * 1000, name)
+    return name
+
+
+def _rotate(directory, keep):
+    for name in list_profiles(directory)[keep:]:
+        for ext in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(directory, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory=None):
+    """Profile names, newest first."""
+    directory = directory or profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = {f[:-len(".txt")] for f in os.listdir(directory) if f.endswith(".txt")}
+    return sorted((n for n in names if _NAME_RE.match(n)), reverse=True)
+
+
+def profile_path(name, ext):
+    """Path of a stored profile file; None for names that aren't ours."""
+    if not _NAME_RE.match(name):
+        return None
+    path = os.path.join(profile_dir(), name + ext)
+    return path if os.path.isfile(path) else None
+
+
+# ── summaries ────────────────────────────────────────────────────────────────
+
+def _label(func):
+    filename, line, funcname = func
+    if filename == "~":
+        return funcname  # built-in
+    return f"{funcname}  ({os.path.basename(filename)}:{line})"
+
+
+def summarize(stats):
+    """The hottest functions by cumulative time, then the call tree."""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    out.write("\nCall tree (cumulative ms, calls):\n")
+    out.write(call_tree(stats.stats))
+    return out.getvalue()
+
+
+def call_tree(raw):
+    """Indented tree of callers to callees from raw ``pstats`` data."""
+    callees = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in raw.items():
+        for caller, (_, nc, _, ct) in callers.items():
+            callees.setdefault(caller, []).append((ct, nc, func))
+    roots = [f for f, v in raw.items() if not v[4]]
+    total = sum(raw[f][3] for f in roots) or 1.0
+
+    lines = []
+
+    def walk(func, ct, nc, depth, seen):
+        lines.append(f"{'  ' * depth}{ct * 1000:9.1f} {nc:6d}  {_label(func)}")
+        if depth >= TREE_MAX_DEPTH or func in seen:
+            return
+        for child_ct, child_nc, child in sorted(callees.get(func, ()), reverse=True):
+            if child_ct / total >= TREE_MIN_SHARE:
+                walk(child, child_ct, child_nc, depth + 1, seen | {func})
+
+    for root in sorted(roots, key=lambda f: raw[f][3], reverse=True):
+        if raw[root][3] / total >= TREE_MIN_SHARE:
+            walk(root, raw[root][3], raw[root][1], 0, frozenset())
+    return "\n".join(lines) + "\n"
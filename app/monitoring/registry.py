@@ -0,0 +1,134 @@
+"""
+Pluggable in-process registry for application (domain) metrics.
+
+Code records through labelled counter and histogram families obtained from
+the app's registry by name (created on first use, so there is no central
+declaration). ``/metrics`` appends ``registry.render()`` to the HTTP
+metrics. Any object offering ``counter()``, ``histogram()`` and ``render()``
+can replace the default with ``use_registry(app, registry)``, e.g. an adapter
+onto ``prometheus_client`` or a test double.
+
+Without ``METRICS_ENABLED`` there is no registry and recording is a no-op.
+"""
+import threading
+from abc import ABC, abstractmethod
+from flask import current_app, has_app_context
+from app.monitoring.metrics import Histogram, _labels
+
+HELP_AND_TYPE = "# HELP {name} {help}\n# TYPE {name} {type}"
+
+
+class _Family(ABC):
+    type = None
+
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def _lines(self):
+        """Sample lines, rendered with the lock held."""
+
+    def render(self):
+        with self._lock:
+            body = self._lines()
+        return "\n".join([HELP_AND_TYPE.format(name=self.name, help=self.help, type=self.type),
+                          *body])
+
+
+class CounterFamily(_Family):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._children.get(self._key(labels), 0)
+
+    def _lines(self):
+        return [f"{self.name}{_labels(**dict(zip(self.labelnames, key)))} {value}"
+                for key, value in sorted(self._children.items())]
+
+
+class HistogramFamily(_Family):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labelnames, buckets):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            hist = self._children.get(key)
+            if hist is None:
+                hist = self._children[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def snapshot(self, **labels):
+        """``(count, sum)`` for one label set."""
+        with self._lock:
+            hist = self._children.get(self._key(labels))
+            return (hist.count, hist.sum) if hist else (0, 0.0)
+
+    def _lines(self):
+        lines = []
+        for key, hist in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            for le, n in hist.cumulative():
+                lines.append(f"{self.name}_bucket{_labels(**labels, le=le)} {n}")
+            lines.append(f"{self.name}_sum{_labels(**labels)} {hist.sum:.6f}")
+            lines.append(f"{self.name}_count{_labels(**labels)} {hist.count}")
+        return lines
+
+
+class Registry:
+    """Metric families by name; asking again for a name returns the same family."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = factory()
+            return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(name, lambda: CounterFamily(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, buckets, labelnames=()):
+        return self._get(name, lambda: HistogramFamily(name, help_text, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+        return "".join(f.render() + "\n" for f in families)
+
+
+def init_app(app):
+    if app.config.get("METRICS_ENABLED"):
+        app.extensions.setdefault("metrics_registry", Registry())
+
+
+def use_registry(app, registry):
+    """Plug in another registry implementation."""
+    app.extensions["metrics_registry"] = registry
+
+
+def metrics_registry():
+    """The current app's registry, or None when metrics are disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("metrics_registry")
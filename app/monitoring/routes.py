@@ -0,0 +1,72 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, render_template, request, send_file
+from flask_login import current_user, login_required
+from app.auth.decorators import admin_required
+from app.monitoring import profiler
+from app.monitoring.metrics import metrics
+from app.monitoring.registry import metrics_registry
+
+monitoring_bp = Blueprint("monitoring", __name__)
+
+
+def _authorized():
+    """Admins, or a scraper presenting ``METRICS_TOKEN`` as a bearer token."""
+    token = current_app.config.get("METRICS_TOKEN")
+    auth = request.headers.get("Authorization", "")
+    if token and auth.startswith("Bearer "):
+        return hmac.compare_digest(auth[len("Bearer "):], token)
+    return current_user.is_authenticated and current_user.role == "admin"
+
+
+@monitoring_bp.route("/metrics")
+def prometheus_metrics():
+    registry = metrics()
+    if registry is None:
+        abort(404)
+    if not _authorized():
+        abort(403)
+    text = registry.render()
+    domain = metrics_registry()
+    if domain is not None:
+        text += domain.render()
+    return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@monitoring_bp.route("/profiles/")
+@login_required
+@admin_required
+def list_profiles():
+    """Recent request profiles, and a token for profiling the next ones."""
+    if not current_app.config.get("PROFILING_ENABLED"):
+        abort(404)
+    return render_template(
+        "monitoring/profiles.html",
+        profiles=profiler.list_profiles(),
+        token=profiler.profile_token(current_user.id),
+        max_age=current_app.config["PROFILE_TOKEN_MAX_AGE"],
+        param=profiler.PARAM,
+        header=profiler.HEADER,
+    )
+
+
+@monitoring_bp.route("/profiles/<name>")
+@login_required
+@admin_required
+def show_profile(name):
+    path = profiler.profile_path(name, ".txt")
+    if path is None:
+        abort(404)
+    with open(path, encoding="utf-8") as fh:
+        summary = fh.read()
+    return render_template("monitoring/profile.html", name=name, summary=summary)
+
+
+@monitoring_bp.route("/profiles/<name>.prof")
+@login_required
+@admin_required
+def download_profile(name):
+    path = profiler.profile_path(name, ".prof")
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype="application/octet-stream",
+                     as_attachment=True, download_name=name + ".prof")
@@ -0,0 +1,49 @@
+"""
+Named change counters stored in ``cache_versions``.
+
+Writers bump a counter inside their own transaction; readers compare it with
+what they cached (or what a client sent back) to tell whether anything
+changed. Counters spring into existence at version 1 on the first bump; if
+two transactions race to create the same counter, the loser's INSERT is rolled
+back to a savepoint and it increments the winner's row instead.
+"""
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import CacheVersion
+
+_table = CacheVersion.__table__
+
+
+def current_version(name):
+    return db.session.scalar(
+        select(CacheVersion.version).where(CacheVersion.name == name)
+    ) or 0
+
+
+def version_info(name):
+    """``(version, updated_at)`` of the counter, ``(0, None)`` if never bumped."""
+    row = db.session.execute(
+        select(CacheVersion.version, CacheVersion.updated_at)
+        .where(CacheVersion.name == name)
+    ).first()
+    return tuple(row) if row else (0, None)
+
+
+def _increment(connection, name):
+    return connection.execute(
+        update(_table).where(_table.c.name == name).values(version=_table.c.version + 1)
+    ).rowcount
+
+
+def bump_version(connection, *names):
+    """Increment every counter in ``names`` inside the caller's transaction."""
+    for name in dict.fromkeys(names):
+        if _increment(connection, name):
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(_table).values(name=name, version=1))
+        except IntegrityError:
+            # created by a concurrent transaction since our UPDATE
+            _increment(connection, name)
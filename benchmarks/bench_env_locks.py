@@ -0,0 +1,91 @@
+"""
+Multi-threaded booking stress run: throughput vs. number of environments.
+
+    python benchmarks/bench_env_locks.py [--db URL] [--threads 8] [--per-thread 25]
+
+Every thread books consecutive, non-clashing slots round-robin across the
+environments and races the other threads for the same slots. The run checks
+that no environment ends up with overlapping bookings and reports
+successful bookings per second. On SQLite all writers share one database
+lock, so the scaling with environment count shows best on MySQL.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import Booking, Environment, User  # noqa: E402
+from app.bookings.service import BookingService  # noqa: E402
+
+
+def setup(env_count):
+    db.drop_all()
+    db.create_all()
+    db.session.add(User(email="bench@example.com", role="regular", password_hash="x"))
+    for i in range(env_count):
+        db.session.add(Environment(name=f"Bench{i}", owner_squad="bench",
+                                   created_by_email="bench@example.com"))
+    db.session.commit()
+    return [e.id for e in Environment.query.order_by(Environment.id)]
+
+
+def run(app, env_count, threads, per_thread):
+    with app.app_context():
+        env_ids = setup(env_count)
+    base = datetime(2030, 1, 1, 0, 0)
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        with app.app_context():
+            user = User.query.first()
+            envs = [db.session.get(Environment, i) for i in env_ids]
+            barrier.wait()
+            for n in range(per_thread):
+                start = base + timedelta(hours=n)
+                BookingService.attempt_single_booking(
+                    user, envs[n % len(envs)], start, start + timedelta(minutes=30))
+            db.session.remove()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with app.app_context():
+        booked = 0
+        for env_id in env_ids:
+            rows = db.session.query(Booking.start, Booking.end).filter_by(
+                environment_id=env_id).order_by(Booking.start).all()
+            assert all(b[0] >= a[1] for a, b in zip(rows, rows[1:])), f"overlap in env {env_id}"
+            booked += len(rows)
+    return booked, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=25)
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.db or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+    print(f"{'envs':>5} {'booked':>7} {'seconds':>8} {'bookings/s':>11}")
+    for env_count in args.envs:
+        booked, elapsed = run(app, env_count, args.threads, args.per_thread)
+        print(f"{env_count:>5} {booked:>7} {elapsed:>8.2f} {booked / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
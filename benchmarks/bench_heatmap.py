@@ -0,0 +1,79 @@
+"""
+Time the utilization report over a year of synthetic bookings.
+
+    python benchmarks/bench_heatmap.py [--db sqlite:///...] [--envs 40] [--per-day 6]
+
+Bookings are 1–4 hours long, spread over working hours; the report is timed
+with a cold catalog, split into the bulk load and the NumPy binning.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Booking, Environment, User  # noqa: E402
+from app.analytics import heatmap  # noqa: E402
+
+
+def seed(n_envs, per_day, since, days):
+    db.drop_all()
+    db.create_all()
+    user = User(email="bench@example.com", role="admin", password_hash="x")
+    envs = [Environment(name=f"Env {i:03d}", owner_squad=f"squad {i % 5}",
+                        created_by_email="bench@example.com") for i in range(n_envs)]
+    db.session.add_all([user, *envs])
+    db.session.commit()
+
+    rng = random.Random(42)
+    rows = []
+    for env in envs:
+        for day in range(days):
+            for _ in range(per_day):
+                start = since + timedelta(days=day, hours=rng.randint(7, 19))
+                rows.append({"environment_id": env.id, "user_id": user.id, "start": start,
+                             "end": start + timedelta(hours=rng.randint(1, 4))})
+    db.session.execute(insert(Booking), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--envs", type=int, default=40)
+    parser.add_argument("--per-day", type=int, default=6)
+    args = parser.parse_args()
+
+    url = args.db or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    app = create_app("testing")
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+
+    since = datetime(2030, 1, 1)
+    until = since + timedelta(days=365)
+    with app.app_context():
+        count = seed(args.envs, args.per_day, since, 365)
+        env_ids = [e.id for e in Environment.query.order_by(Environment.name)]
+
+        t0 = time.perf_counter()
+        env_idx, starts, ends = heatmap.load_bookings(since, until, env_ids)
+        t1 = time.perf_counter()
+        heatmap.occupancy_matrix(env_idx, starts, ends, len(env_ids),
+                                 heatmap._epoch(since), 365 * 24)
+        t2 = time.perf_counter()
+        heatmap.utilization_report(since, until)
+        t3 = time.perf_counter()
+
+        print(f"{count} bookings, {len(env_ids)} environments, {365 * 24} hourly slots")
+        print(f"load {t1 - t0:.3f}s  bin {t2 - t1:.3f}s  full report {t3 - t2:.3f}s")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
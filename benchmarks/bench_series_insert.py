@@ -0,0 +1,72 @@
+"""
+Compare the per-row flush insert path with the bulk series insert path.
+
+    python benchmarks/bench_series_insert.py [--db sqlite:///...] [--sizes 50 500 5000]
+
+Each size runs against a fresh schema; the legacy path is reproduced here
+as it was before the bulk insert (one add + flush + audit row per booking).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import AuditLog, Booking, Environment, User  # noqa: E402
+from app.bookings.service import BookingService  # noqa: E402
+
+
+def legacy_insert(user, environment, slots, action):
+    for start, end in slots:
+        b = Booking(environment_id=environment.id, user_id=user.id, start=start, end=end)
+        db.session.add(b)
+        db.session.flush()
+        db.session.add(AuditLog(
+            action=action, actor_id=user.id,
+            details=f"booking #{b.id} in env “{environment.name}” "
+                    f"from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}",
+        ))
+    return len(slots)
+
+
+def run(insert, size):
+    db.drop_all()
+    db.create_all()
+    user = User(email="bench@example.com", role="admin", password_hash="x")
+    env = Environment(name="Bench", owner_squad="bench", created_by_email="bench@example.com")
+    db.session.add_all([user, env])
+    db.session.commit()
+
+    base = datetime(2030, 1, 1, 9, 0)
+    slots = [(base + timedelta(days=i), base + timedelta(days=i, hours=1)) for i in range(size)]
+    t0 = time.perf_counter()
+    insert(user, env, slots, "create_series")
+    db.session.commit()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    args = parser.parse_args()
+
+    url = args.db or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    app = create_app("testing")
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+
+    print(f"{'slots':>6} {'legacy (s)':>11} {'bulk (s)':>9} {'speed-up':>9}")
+    with app.app_context():
+        for size in args.sizes:
+            legacy = run(legacy_insert, size)
+            bulk = run(BookingService._bulk_insert_with_audit, size)
+            print(f"{size:>6} {legacy:>11.3f} {bulk:>9.3f} {legacy / bulk:>8.1f}x")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
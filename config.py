@@ -6,10 +6,57 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "you-will-change-this")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Answer overlap checks from an in-process interval index instead of
+    # querying per candidate slot. Only safe with a single writer process.
+    BOOKING_INDEX_ENABLED = os.environ.get("BOOKING_INDEX_ENABLED", "0") == "1"
+    # Write audit rows from a background thread in batches instead of inside
+    # the request transaction.
+    AUDIT_ASYNC = os.environ.get("AUDIT_ASYNC", "0") == "1"
+    AUDIT_BATCH_SIZE = 200
+    AUDIT_FLUSH_INTERVAL = 1.0  # seconds
+    # Move audit entries older than AUDIT_RETENTION_DAYS into monthly
+    # .ndjson.gz archives (scheduled job, or `flask archive-audit`).
+    AUDIT_RETENTION_ENABLED = os.environ.get("AUDIT_RETENTION_ENABLED", "0") == "1"
+    AUDIT_RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", "365"))
+    AUDIT_RETENTION_INTERVAL_HOURS = 24
+    AUDIT_ARCHIVE_BATCH_SIZE = 1000
+    AUDIT_ARCHIVE_DIR = os.environ.get(
+        "AUDIT_ARCHIVE_DIR", os.path.join(basedir, "instance", "audit-archive")
+    )
+    # Seconds to cache dashboard aggregates (0 disables the cache). Writes
+    # invalidate entries on commit; the TTL only bounds time-based drift.
+    DASHBOARD_CACHE_TTL = int(os.environ.get("DASHBOARD_CACHE_TTL", "30"))
+    # Keep the environment list in memory; a version counter in the
+    # cache_versions table tells each process when to reload it.
+    ENV_CATALOG_CACHE = os.environ.get("ENV_CATALOG_CACHE", "1") == "1"
+    # LRU of logged-in users' (id, email, role) for the user loader; 0 disables.
+    # Other processes notice role changes and deleted users through the
+    # "users" counter in cache_versions, checked at most every
+    # USER_CACHE_VERSION_CHECK seconds (so that is how stale they can get).
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL = 60  # seconds
+    USER_CACHE_VERSION_CHECK = int(os.environ.get("USER_CACHE_VERSION_CHECK", "5"))
+    # Per-endpoint latency, status and SQL counts at /metrics (Prometheus
+    # text format) for admins, or scrapers sending "Bearer <METRICS_TOKEN>".
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    # Query diagnostics (0 disables each): log statements slower than
+    # SLOW_QUERY_MS, and requests running one statement shape more than
+    # N_PLUS_ONE_THRESHOLD times (a likely N+1 lazy load).
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "0"))
+    # Admins can run single requests under cProfile with a signed token
+    # (see /profiles/); only the newest PROFILE_KEEP profiles are kept.
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "1") == "1"
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(basedir, "instance", "profiles"))
+    PROFILE_KEEP = 50
+    PROFILE_TOKEN_MAX_AGE = 3600  # seconds
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
     SQLALCHEMY_DATABASE_URI = (
         os.environ.get("DATABASE_URL")
         or f"sqlite:///{os.path.join(basedir, 'instance', 'dev.db')}"
@@ -20,6 +67,14 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_TEST_URL", "sqlite:///:memory:")
+    # tests share one app across freshly created databases
+    DASHBOARD_CACHE_TTL = 0
+    ENV_CATALOG_CACHE = False
+    USER_CACHE_SIZE = 0
+    # QUERY_DIAGNOSTICS_STRICT=1 fails every test that logs a slow query or N+1
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
+    QUERY_DIAGNOSTICS_STRICT = os.environ.get("QUERY_DIAGNOSTICS_STRICT", "0") == "1"
 
 
 class ProductionConfig(Config):
@@ -27,4 +82,7 @@ class ProductionConfig(Config):
     SQLALCHEMY_ENGINE_OPTIONS = {
     "pool_recycle": 280,
     "pool_pre_ping": True,
+    # validation reads after the environment row lock must see rows
+    # committed by the previous lock holder, not an older snapshot
+    "isolation_level": "READ COMMITTED",
     }
@@ -0,0 +1,77 @@
+import pytest
+from app import db
+from app.auth.cache import CachedUser, UserCache
+from app.auth.service import AuthService
+from app.models import User
+from tests.utils import login_admin, login_user, logout_user
+
+
+@pytest.fixture
+def cache(client, monkeypatch):
+    cache = UserCache(maxsize=2, ttl=60)
+    monkeypatch.setitem(client.application.extensions, "user_cache", cache)
+    return cache
+
+
+def test_loader_serves_cached_records(client, cache):
+    login_user(client)
+    client.get("/dashboard")
+    client.get("/bookings/")
+    assert cache.hits >= 2 and cache.misses == 1
+    with client.application.app_context():
+        record = cache.get(1, lambda _: pytest.fail("should be cached"))
+    assert isinstance(record, CachedUser) and record.email == "eve@example.com"
+
+
+def test_role_change_invalidates_entry(client, cache):
+    login_user(client)
+    assert client.get("/environments/").status_code == 403
+
+    with client.application.app_context():
+        AuthService.set_role(db.session.get(User, 1), "admin")
+    assert client.get("/environments/").status_code == 200
+    assert cache.misses == 2
+
+
+def test_change_committed_elsewhere_clears_the_cache(client, cache):
+    from app.auth.cache import USERS_KEY
+    from app.versions import bump_version
+    login_user(client)
+    client.get("/bookings/")
+    assert cache.stats()["size"] == 1
+
+    # another worker changed a user: only the shared counter moves here
+    with client.application.app_context():
+        bump_version(db.session.connection(), USERS_KEY)
+        db.session.commit()
+    client.get("/bookings/")
+    assert cache.misses == 1  # not checked again until version_check passes
+
+    cache._next_check = 0
+    client.get("/bookings/")
+    assert cache.misses == 2
+
+
+def test_deleted_user_is_logged_out(client, cache):
+    login_user(client)
+    assert client.get("/bookings/").status_code == 200
+    with client.application.app_context():
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+    assert client.get("/bookings/").status_code == 302
+
+
+def test_lru_bound_and_stats_endpoint(client, cache):
+    with client.application.app_context():
+        for i in range(3):
+            AuthService.register(f"u{i}@example.com", "Password123!")
+        for user_id in (3, 4, 5):
+            cache.get(user_id, lambda uid: db.session.get(User, uid))
+    assert cache.stats()["size"] == 2 and cache.evictions == 1
+
+    login_admin(client)
+    data = client.get("/auth/cache").get_json()
+    assert data["maxsize"] == 2 and data["misses"] >= 4
+    logout_user(client)
+    login_user(client)
+    assert client.get("/auth/cache").status_code == 403
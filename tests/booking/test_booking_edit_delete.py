@@ -1,6 +1,6 @@
 import pytest
 from app.models import Booking
-from tests.utils import login_user, login_admin, future_datetime
+from tests.utils import login_user, login_admin, logout_user, future_datetime
 
 @pytest.fixture
 def create_booking(client):
@@ -42,3 +42,107 @@ def test_admin_can_delete_any_booking(client, create_booking):
     login_admin(client)
     resp = client.post(f"/bookings/{create_booking.id}/delete", follow_redirects=True)
     assert b"Booking deleted" in resp.data
+
+def test_bookings_list_pages_with_keyset_cursor(client):
+    login_user(client)
+    for day in range(7, 12):
+        start, end = future_datetime(offset_days=day)
+        client.post("/bookings/new", data={"environment": 1, "start": start, "end": end})
+
+    resp = client.get("/bookings/?limit=2")
+    assert resp.status_code == 200
+    assert resp.data.count(b'data-bs-target="#deleteModal"') == 2
+    assert resp.data.count(b'id="deleteModal"') == 1
+    assert b"Later" in resp.data
+
+    import html
+    import re
+    seen = []
+    url = "/bookings/?limit=2"
+    while url:
+        page = client.get(url).get_data(as_text=True)
+        seen += re.findall(r"/bookings/(\d+)/edit", page)
+        later = re.search(r'href="([^"]+)">\s*Later', page)
+        url = html.unescape(later.group(1)) if later else None
+    assert seen == [str(b.id) for b in Booking.query.order_by(Booking.start).all()]
+    assert client.get("/bookings/?cursor=bogus").status_code == 400
+
+def test_bookings_datatables_endpoint(client):
+    login_user(client)
+    for day in (7, 8, 9):
+        start, end = future_datetime(offset_days=day)
+        client.post("/bookings/new", data={"environment": 1, "start": start, "end": end})
+    day8 = future_datetime(offset_days=8)[0][:10]
+
+    data = client.get("/bookings/data?draw=3&start=1&length=1").get_json()
+    assert (data["draw"], data["recordsTotal"], data["recordsFiltered"]) == (3, 3, 3)
+    assert len(data["data"]) == 1 and data["data"][0]["environment"] == "Env1"
+
+    data = client.get(f"/bookings/data?columns[1][search][value]={day8}").get_json()
+    assert data["recordsFiltered"] == 1 and data["data"][0]["start"].startswith(day8)
+    data = client.get("/bookings/data?columns[0][search][value]=nope").get_json()
+    assert data["recordsFiltered"] == 0
+    for wildcard in ("%25", "_", "Env_"):  # matched literally, not as LIKE wildcards
+        data = client.get(f"/bookings/data?columns[0][search][value]={wildcard}").get_json()
+        assert data["recordsFiltered"] == 0
+
+def test_ics_feed_streams_events_and_honours_etag(client):
+    import re
+    login_user(client)
+    for day in (7, 8):
+        start, end = future_datetime(offset_days=day)
+        client.post("/bookings/new", data={"environment": 1, "start": start, "end": end})
+    page = client.get("/bookings/").get_data(as_text=True)
+    url = re.search(r'href="http://localhost(/bookings/feed/[^"]+\.ics)"', page).group(1)
+    logout_user(client)
+
+    resp = client.get(url)
+    body = resp.get_data(as_text=True)
+    assert resp.status_code == 200 and resp.mimetype == "text/calendar"
+    assert body.count("BEGIN:VEVENT") == 2 and "SUMMARY:Booking for Env1" in body
+    etag = resp.headers["ETag"]
+
+    unchanged = client.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.data == b""
+    assert client.get(url, headers={"If-Modified-Since": resp.headers["Last-Modified"]}).status_code == 304
+
+    login_user(client)
+    client.post(f"/bookings/{Booking.query.first().id}/delete")
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert resp.get_data(as_text=True).count("BEGIN:VEVENT") == 1
+
+    assert client.get("/bookings/feed/forged.ics").status_code == 404
+
+def test_rotating_the_feed_secret_revokes_old_feed_urls(client):
+    import re
+    login_user(client)
+    page = client.get("/bookings/").get_data(as_text=True)
+    old = re.search(r'href="http://localhost(/bookings/feed/[^"]+\.ics)"', page).group(1)
+    assert client.get(old).status_code == 200
+
+    resp = client.post("/bookings/feed/rotate", follow_redirects=True)
+    assert b"calendar feed links were reset" in resp.data
+    new = re.search(r'href="http://localhost(/bookings/feed/[^"]+\.ics)"',
+                    resp.get_data(as_text=True)).group(1)
+    logout_user(client)
+    assert new != old
+    assert client.get(old).status_code == 404
+    assert client.get(new).status_code == 200
+
+
+def test_renaming_an_environment_refreshes_its_feeds(client):
+    import re
+    login_admin(client)
+    start, end = future_datetime(offset_days=7)
+    client.post("/bookings/new", data={"environment": 1, "start": start, "end": end})
+    user_url = re.search(r'href="http://localhost(/bookings/feed/[^"]+\.ics)"',
+                         client.get("/bookings/").get_data(as_text=True)).group(1)
+    env_url = re.search(r'href="http://localhost(/bookings/feed/[^"]+\.ics)"',
+                        client.get("/environments/").get_data(as_text=True)).group(1)
+    etags = {url: client.get(url).headers["ETag"] for url in (user_url, env_url)}
+
+    client.post("/environments/1/edit", data={"name": "Renamed", "owner_squad": "team 1"})
+    for url, etag in etags.items():
+        resp = client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 200 and "SUMMARY:Booking for Renamed" in resp.get_data(as_text=True)
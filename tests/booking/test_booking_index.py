@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Booking, Environment, User
+from app.bookings.index import IntervalIndex, _load_env_bookings
+from app.bookings.service import BookingService
+
+
+def test_index_overlap_queries_without_db():
+    base = datetime(2030, 1, 7, 9, 0)
+    rows = [
+        (1, base, base + timedelta(hours=1)),
+        (2, base + timedelta(hours=2), base + timedelta(hours=3)),
+        (3, base - timedelta(hours=8), base + timedelta(minutes=30)),  # long, forced
+    ]
+    index = IntervalIndex(lambda env_id: rows)
+
+    assert index.overlaps(1, base + timedelta(minutes=15), base + timedelta(minutes=45))
+    assert not index.overlaps(1, base + timedelta(hours=1), base + timedelta(hours=2))
+    hits = index.overlapping(1, base - timedelta(hours=1), base + timedelta(minutes=10))
+    assert {h[2] for h in hits} == {1, 3}
+    excl = index.overlapping(1, base, base + timedelta(hours=1), exclude_id=1)
+    assert [h[2] for h in excl] == [3]
+
+    index.remove(1, 3)
+    index.remove(1, 1)
+    assert not index.overlaps(1, base, base + timedelta(hours=1))
+    index.add(1, 4, base, base + timedelta(minutes=5))
+    assert index.overlaps(1, base, base + timedelta(hours=1))
+
+
+@pytest.fixture
+def indexed(client, monkeypatch):
+    index = IntervalIndex(_load_env_bookings)
+    monkeypatch.setitem(client.application.extensions, "booking_index", index)
+    return index
+
+
+def test_index_follows_booking_service_mutations(client, indexed):
+    with client.application.app_context():
+        user = User.query.filter_by(email="eve@example.com").first()
+        env = Environment.query.first()
+        start = (datetime.now() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+        end = start + timedelta(hours=1)
+
+        assert not BookingService._overlap_exists(env.id, start, end)  # builds the index
+        ok, b = BookingService.attempt_single_booking(user, env, start, end)
+        assert ok
+        assert BookingService._overlap_exists(env.id, start, end)
+
+        later = start + timedelta(hours=4)
+        ok, _ = BookingService.attempt_edit_booking(b, user, env, later, later + timedelta(hours=1))
+        assert ok
+        assert not BookingService._overlap_exists(env.id, start, end)
+        assert BookingService._overlap_exists(env.id, later, later + timedelta(minutes=30))
+
+        BookingService.delete_booking(b, user)
+        assert not BookingService._overlap_exists(env.id, later, later + timedelta(hours=1))
+
+
+def test_index_discards_rolled_back_changes(client, indexed):
+    with client.application.app_context():
+        env = Environment.query.first()
+        start = datetime(2030, 1, 7, 9, 0)
+        end = start + timedelta(hours=1)
+
+        assert not BookingService._overlap_exists(env.id, start, end)
+        db.session.add(Booking(environment_id=env.id, user_id=1, start=start, end=end))
+        db.session.flush()
+        db.session.rollback()
+        assert not BookingService._overlap_exists(env.id, start, end)
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import Environment, User
+from app.bookings.service import BookingService
+from app.monitoring.registry import Registry
+from tests.utils import login_admin
+
+
+@pytest.fixture
+def registry(client, monkeypatch):
+    registry = Registry()
+    monkeypatch.setitem(client.application.extensions, "metrics_registry", registry)
+    return registry
+
+
+def _counter(registry, name, labelnames, **labels):
+    return registry.counter(name, "", labelnames).value(**labels)
+
+
+def test_booking_outcomes_are_counted(client, registry):
+    start = (datetime.now() + timedelta(days=7)).replace(hour=9, minute=0, second=0, microsecond=0)
+    with client.application.app_context():
+        user = User.query.filter_by(email="eve@example.com").first()
+        admin = User.query.filter_by(email="admin@example.com").first()
+        env = Environment.query.first()
+        env_id = env.id
+
+        assert BookingService.attempt_single_booking(user, env, start, start + timedelta(hours=1))[0]
+        assert not BookingService.attempt_single_booking(user, env, start, start + timedelta(hours=1))[0]
+        assert not BookingService.attempt_single_booking(user, env, start, start + timedelta(hours=9))[0]
+        assert BookingService.attempt_single_booking(admin, env, start, start + timedelta(hours=1),
+                                                     force=True)[0]
+        s, _ = BookingService.find_suggestion(env, start, start + timedelta(hours=1))
+        assert s == start - timedelta(hours=1)
+
+    created = ("environment", "kind")
+    assert _counter(registry, "booking_created_total", created, environment=env_id, kind="single") == 1
+    assert _counter(registry, "booking_created_total", created, environment=env_id, kind="forced_single") == 1
+    assert _counter(registry, "booking_forced_total", created, environment=env_id, kind="forced_single") == 1
+    rejected = ("environment", "reason")
+    assert _counter(registry, "booking_rejected_total", rejected, environment=env_id, reason="clash") == 1
+    assert _counter(registry, "booking_rejected_total", rejected, environment=env_id, reason="duration") == 1
+
+    # -1h is the 7th offset in the -15m, +15m, -30m, ... order; one range query
+    offsets = registry.histogram("booking_suggestion_offsets_tried", "", (), ("kind",))
+    queries = registry.histogram("booking_suggestion_queries", "", (), ("kind",))
+    assert offsets.snapshot(kind="single") == (1, 7)
+    assert queries.snapshot(kind="single") == (1, 1)
+
+
+def test_series_validation_is_measured(client, registry):
+    monday = datetime.now().date() + timedelta(days=14 - datetime.now().weekday())
+    with client.application.app_context():
+        user = User.query.filter_by(email="eve@example.com").first()
+        env = Environment.query.first()
+        env_id = env.id
+        ok, count = BookingService.create_series(
+            user, env, monday, monday + timedelta(days=13), ["0", "2", "4"],
+            datetime.strptime("10:00", "%H:%M").time(), datetime.strptime("11:00", "%H:%M").time(),
+        )
+    assert ok and count == 6
+    assert registry.histogram("booking_series_slots", "", ()).snapshot() == (1, 6)
+    assert registry.histogram("booking_series_validation_queries", "", ()).snapshot() == (1, 1)
+    assert registry.histogram("booking_series_validation_seconds", "", ()).snapshot()[0] == 1
+    assert _counter(registry, "booking_created_total", ("environment", "kind"),
+                    environment=env_id, kind="series") == 6
+
+
+def test_domain_metrics_are_exported(client, registry):
+    registry.counter("booking_created_total", "Bookings created.",
+                     ("environment", "kind")).inc(environment=1, kind="single")
+    login_admin(client)
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE booking_created_total counter" in text
+    assert 'booking_created_total{environment="1",kind="single"} 1' in text
@@ -1,7 +1,7 @@
 import pytest
 from datetime import datetime, timedelta
 from app import db
-from app.models import Booking, Environment, User
+from app.models import AuditLog, Booking, Environment, User
 from app.bookings.service import BookingService
 from tests.utils import future_datetime, login_user
 
@@ -124,3 +124,148 @@ def test_attempt_single_booking_admin_force(client):
         ok, result = BookingService.attempt_single_booking(user, env, start, end, force=True)
         assert ok
         assert hasattr(result, "id")
+
+def test_validate_series_reports_every_failing_slot(client):
+    with client.application.app_context():
+        env = Environment.query.first()
+        base = datetime(2030, 1, 7, 9, 0)  # Monday
+        for day in (0, 2):
+            s = base + timedelta(days=day)
+            db.session.add(Booking(environment_id=env.id, user_id=1, start=s, end=s + timedelta(hours=1)))
+        db.session.commit()
+
+        slots = BookingService._build_slots(base, base + timedelta(days=4, hours=1), ["0", "1", "2", "3", "4"])
+        slots.append((base + timedelta(days=5), base + timedelta(days=5, hours=9)))
+        failures = BookingService._validate_series(env.id, slots)
+
+        assert [(s.day, reason) for s, reason, _ in failures] == [(7, "clash"), (9, "clash"), (12, "duration")]
+        assert "clash" in failures[0][2]
+        assert "exceed 8 hours" in failures[2][2]
+
+def test_find_suggestions_ranks_free_gaps_by_distance(client):
+    with client.application.app_context():
+        env = Environment.query.first()
+        nine = datetime(2030, 1, 7, 9, 0)
+        db.session.add(Booking(environment_id=env.id, user_id=1, start=nine, end=nine + timedelta(hours=1)))
+        db.session.commit()
+
+        desired = (nine + timedelta(minutes=30), nine + timedelta(minutes=90))
+        assert BookingService.find_suggestion(env, *desired) == (
+            nine + timedelta(hours=1), nine + timedelta(hours=2))
+        assert BookingService.find_suggestions(env, *desired) == [
+            (nine + timedelta(hours=1), nine + timedelta(hours=2)),
+            (nine - timedelta(hours=1), nine),
+        ]
+
+def test_find_series_suggestion_skips_offsets_clashing_on_any_day(client):
+    with client.application.app_context():
+        env = Environment.query.first()
+        monday = datetime(2030, 1, 7, 9, 0)
+        # Tue 08:20–10:10 and Wed 10:00–11:00: later shifts must clear 11:00 on
+        # Wednesday, so the nearest working shift is the earlier one (-1:45).
+        for start, end in [(datetime(2030, 1, 8, 8, 20), datetime(2030, 1, 8, 10, 10)),
+                           (datetime(2030, 1, 9, 10, 0), datetime(2030, 1, 9, 11, 0))]:
+            db.session.add(Booking(environment_id=env.id, user_id=1, start=start, end=end))
+        db.session.commit()
+
+        s, e = BookingService.find_series_suggestion(
+            env, monday.date(), (monday + timedelta(days=2)).date(), ["0", "1", "2"],
+            monday.time(), (monday + timedelta(hours=1)).time()
+        )
+        assert (s.strftime("%H:%M"), e.strftime("%H:%M")) == ("07:15", "08:15")
+
+        s, _ = BookingService.find_series_suggestion(
+            env, monday.date(), (monday + timedelta(days=2)).date(), ["0", "1", "2"],
+            monday.time(), (monday + timedelta(hours=1)).time(), step=timedelta(minutes=5)
+        )
+        assert s.strftime("%H:%M") == "07:20"
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_bulk_insert_with_audit_links_audit_rows_to_ids(client, monkeypatch, returning):
+    with client.application.app_context():
+        dialect = db.session.get_bind().dialect
+        monkeypatch.setattr(dialect, "insert_executemany_returning_sort_by_parameter_order", returning)
+        user = User.query.filter_by(email="eve@example.com").first()
+        env = Environment.query.first()
+        base = datetime(2030, 1, 7, 9, 0)
+        slots = [(base + timedelta(days=i), base + timedelta(days=i, hours=1)) for i in range(3)]
+
+        assert BookingService._bulk_insert_with_audit(user, env, slots, "create_series") == 3
+        db.session.commit()
+
+        bookings = Booking.query.order_by(Booking.start).all()
+        entries = AuditLog.query.filter_by(action="create_series").order_by(AuditLog.id).all()
+        assert [b.start for b in bookings] == [s for s, _ in slots]
+        assert [(a.booking_id, a.start, a.end) for a in entries] == [
+            (b.id, b.start, b.end) for b in bookings
+        ]
+        assert [a.message for a in entries] == [
+            f"booking #{b.id} in env “Env1” from {b.start:%Y-%m-%d %H:%M} to {b.end:%Y-%m-%d %H:%M}"
+            for b in bookings
+        ]
+        assert BookingService._daily_util_seconds(env.id, base.date()) == 3600
+
+def test_availability_applies_duration_limit_and_daily_cap(client):
+    with client.application.app_context():
+        env = get_environment()
+        day = datetime(2030, 1, 7)
+        for s, e in [(0, 8), (8, 16), (16, 20)]:
+            db.session.add(Booking(environment_id=env.id, user_id=1,
+                                   start=day + timedelta(hours=s), end=day + timedelta(hours=e)))
+        db.session.commit()
+
+        lo, hi = day, day + timedelta(days=1, hours=12)
+        result = BookingService.availability([env.id], lo, hi, now=datetime(2029, 1, 1))[env.id]
+        assert result["busy"] == [(day, day + timedelta(hours=20))]
+        assert result["free"] == [(day + timedelta(hours=20), hi)]
+        assert [(w["start"], w["max_duration"]) for w in result["bookable"]] == [
+            (day + timedelta(hours=20), timedelta(minutes=96)),   # 20h of the 21.6h cap used
+            (day + timedelta(days=1), BookingService.MAX_DURATION),
+        ]
+
+        two_hours = BookingService.availability([env.id], lo, hi, duration=timedelta(hours=2),
+                                                now=datetime(2029, 1, 1))[env.id]["bookable"]
+        assert [(w["start"], w["latest_start"]) for w in two_hours] == [
+            (day + timedelta(days=1), day + timedelta(days=1, hours=10))
+        ]
+
+def test_availability_endpoint(client):
+    login_user(client)
+    resp = client.get("/bookings/availability?env=1&start=2030-01-07T08:00&end=2030-01-07T12:00&duration=30")
+    env = resp.get_json()["environments"][0]
+    assert env["name"] == "Env1" and env["busy"] == []
+    assert env["bookable"] == [{"start": "2030-01-07T08:00", "latest_start": "2030-01-07T11:30",
+                                "end": "2030-01-07T12:00", "max_duration_minutes": 240}]
+    assert client.get("/bookings/availability?env=1&start=2030-01-07T08:00&end=2030-03-07T08:00").status_code == 400
+    assert client.get("/bookings/availability?env=99&start=2030-01-07T08:00&end=2030-01-07T12:00").status_code == 404
+
+def test_find_free_environments_ranks_by_daily_use(client):
+    with client.application.app_context():
+        for name, squad in [("Env2", "team 1"), ("Env3", "team 2")]:
+            db.session.add(Environment(name=name, owner_squad=squad, created_by_email="admin@example.com"))
+        day = datetime(2030, 1, 7)
+        db.session.add_all([
+            Booking(environment_id=1, user_id=1, start=day + timedelta(hours=9), end=day + timedelta(hours=10)),
+            Booking(environment_id=2, user_id=1, start=day + timedelta(hours=13), end=day + timedelta(hours=15)),
+            Booking(environment_id=3, user_id=1, start=day + timedelta(hours=6), end=day + timedelta(hours=7)),
+        ])
+        db.session.commit()
+
+        slot = (day + timedelta(hours=9, minutes=30), day + timedelta(hours=11))
+        assert [name for _, name, _ in BookingService.find_free_environments(*slot)] == ["Env3", "Env2"]
+        assert [name for _, name, _ in BookingService.find_free_environments(*slot, owner_squad="team 1")] == ["Env2"]
+
+        user = db.session.get(User, 1)
+        booking = BookingService.book_first_free(user, *slot, owner_squad="team 1")
+        assert booking.environment_id == 2
+        assert BookingService.book_first_free(user, *slot, owner_squad="team 1") is None
+
+def test_free_environments_endpoint(client):
+    login_user(client)
+    resp = client.get("/bookings/free?start=2030-01-07T09:00&end=2030-01-07T10:00")
+    assert [e["name"] for e in resp.get_json()["environments"]] == ["Env1"]
+
+    resp = client.post("/bookings/free", json={"start": "2030-01-07T09:00", "end": "2030-01-07T10:00"})
+    assert resp.status_code == 201 and resp.get_json()["environment"]["name"] == "Env1"
+    resp = client.post("/bookings/free", json={"start": "2030-01-07T09:30", "end": "2030-01-07T10:30"})
+    assert resp.status_code == 409
@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app import create_app, db
+from app.models import Booking, Environment, User
+from app.bookings.service import BookingService
+from config import TestingConfig
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    """
+    An app on a file database. The shared test app runs on one in-memory
+    connection, which threads cannot use concurrently.
+    """
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/race.db")
+    # every worker holds a connection while it waits at the barrier
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_ENGINE_OPTIONS", {"pool_size": 32}, raising=False)
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        user = User(email="eve@example.com", role="user")
+        user.set_password("RegUser123!")
+        db.session.add(user)
+        db.session.add(Environment(name="Env1", owner_squad="team 1", created_by_email="admin@example.com"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def book_concurrently(app, env_ids, workers_per_env, start, end):
+    """Run ``workers_per_env`` threads per environment racing for one slot."""
+    barrier = threading.Barrier(len(env_ids) * workers_per_env)
+    results = []
+
+    def worker(env_id):
+        with app.app_context():
+            user = User.query.filter_by(email="eve@example.com").first()
+            env = db.session.get(Environment, env_id)
+            barrier.wait()
+            ok, _ = BookingService.attempt_single_booking(user, env, start, end)
+            results.append((env_id, ok))
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(env_id,))
+               for env_id in env_ids for _ in range(workers_per_env)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.mark.parametrize("env_count", [1, 4])
+def test_concurrent_bookings_never_overlap(file_app, env_count):
+    app = file_app
+    with app.app_context():
+        for i in range(2, env_count + 1):
+            db.session.add(Environment(name=f"Env{i}", owner_squad="team 1", created_by_email="admin@example.com"))
+        db.session.commit()
+        env_ids = [e.id for e in Environment.query.order_by(Environment.id)]
+
+    start = datetime(2030, 1, 7, 9, 0)
+    results = book_concurrently(app, env_ids, 6, start, start + timedelta(hours=1))
+
+    for env_id in env_ids:
+        assert sum(ok for e, ok in results if e == env_id) == 1
+    with app.app_context():
+        per_env = db.session.query(Booking.environment_id, db.func.count()).group_by(Booking.environment_id).all()
+        assert dict(per_env) == {env_id: 1 for env_id in env_ids}
+
+
+def test_locks_on_different_environments_do_not_block(client):
+    locks = client.application.extensions["environment_locks"]
+    acquired = threading.Event()
+
+    def other_env():
+        with locks.hold(2):
+            acquired.set()
+
+    with locks.hold(1):
+        t = threading.Thread(target=other_env)
+        t.start()
+        assert acquired.wait(timeout=2)
+        t.join()
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Booking, Environment, EnvironmentDailyUsage, User
+from app.bookings import usage
+from app.bookings.service import BookingService
+
+
+def usage_rows():
+    return {
+        (u.environment_id, u.day): u.booked_seconds
+        for u in EnvironmentDailyUsage.query.filter(EnvironmentDailyUsage.booked_seconds != 0)
+    }
+
+
+def test_rollup_tracks_insert_edit_delete_across_midnight(client):
+    with client.application.app_context():
+        user = User.query.filter_by(email="eve@example.com").first()
+        env = Environment.query.first()
+        late = datetime(2030, 1, 7, 22, 0)
+
+        ok, b = BookingService.attempt_single_booking(user, env, late, late + timedelta(hours=3))
+        assert ok
+        assert usage_rows() == {(env.id, late.date()): 7200,
+                                (env.id, late.date() + timedelta(days=1)): 3600}
+
+        ok, _ = BookingService.attempt_edit_booking(b, user, env, late - timedelta(hours=2), late)
+        assert ok
+        assert usage_rows() == {(env.id, late.date()): 7200}
+        assert BookingService._daily_util_seconds(env.id, late.date(), exclude_id=b.id) == 0
+
+        BookingService.delete_booking(b, user)
+        assert usage_rows() == {}
+
+
+def test_rebuild_usage_command(client):
+    app = client.application
+    with app.app_context():
+        start = datetime(2030, 1, 7, 9, 0)
+        db.session.add(Booking(environment_id=1, user_id=1, start=start, end=start + timedelta(hours=2)))
+        db.session.commit()
+        db.session.execute(db.delete(EnvironmentDailyUsage))
+        db.session.commit()
+        assert usage.used_seconds(1, start.date()) == 0
+
+    result = app.test_cli_runner().invoke(args=["rebuild-usage"])
+    assert "1 rows" in result.output
+    with app.app_context():
+        assert usage.used_seconds(1, start.date()) == 7200
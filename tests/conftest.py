@@ -10,6 +10,23 @@ def app_instance(tmp_path_factory):
     app.config["TESTING"] = True
     return app
 
+@pytest.fixture(autouse=True)
+def query_diagnostics(request):
+    """With QUERY_DIAGNOSTICS_STRICT, fail tests that ran a slow query or an N+1."""
+    if "app_instance" not in request.fixturenames:
+        yield
+        return
+    app = request.getfixturevalue("app_instance")
+    diagnostics = app.extensions.get("query_diagnostics")
+    if diagnostics is not None:
+        diagnostics.clear()
+    yield
+    if diagnostics is not None and app.config.get("QUERY_DIAGNOSTICS_STRICT") \
+            and diagnostics.violations:
+        pytest.fail("Query diagnostics:\n" + "\n".join(
+            f"[{v.kind}] {v.detail}: {v.statement}\n{v.origin}" for v in diagnostics.violations
+        ), pytrace=False)
+
 @pytest.fixture
 def client(app_instance):
     with app_instance.app_context():
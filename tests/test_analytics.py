@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import numpy as np
+from app import db
+from app.analytics.heatmap import SLOT, occupancy_matrix, utilization_report
+from app.models import Booking
+from tests.utils import login_user, login_admin, logout_user
+
+
+def test_occupancy_matrix_splits_bookings_across_hours():
+    origin = 0
+    # env 0: 00:30–03:15 (partial, two full hours, partial); env 1: 01:10–01:40
+    env_idx = np.array([0, 1])
+    starts = np.array([30 * 60, SLOT + 10 * 60])
+    ends = np.array([3 * SLOT + 15 * 60, SLOT + 40 * 60])
+    occ = occupancy_matrix(env_idx, starts, ends, 2, origin, 5)
+    assert occ[0].tolist() == [1800, 3600, 3600, 900, 0]
+    assert occ[1].tolist() == [0, 1800, 0, 0, 0]
+
+
+def test_utilization_report(client):
+    # Monday 2030-01-07, 09:00–11:00
+    monday = datetime(2030, 1, 7)
+    with client.application.app_context():
+        db.session.add(Booking(environment_id=1, user_id=1,
+                               start=monday + timedelta(hours=9),
+                               end=monday + timedelta(hours=11)))
+        db.session.commit()
+        report = utilization_report(monday, monday + timedelta(weeks=1))
+
+    assert report["hours"] == 7 * 24
+    env = report["environments"][0]
+    assert env["booked_hours"] == 2
+    assert env["heatmap"][0][9] == env["heatmap"][0][10] == 1
+    assert env["peak_hour_of_week"] == 9
+    assert env["percentiles"]["p50"] == 0
+    assert report["squads"] == [{"squad": "team 1", "environments": 1,
+                                 "booked_hours": 2, "utilization": round(2 / 168, 4)}]
+
+
+def test_utilization_page_is_admin_only(client):
+    login_user(client)
+    assert client.get("/analytics/utilization").status_code == 403
+    logout_user(client)
+    login_admin(client)
+    resp = client.get("/analytics/utilization")
+    assert resp.status_code == 200 and b"Env1" in resp.data
+    data = client.get("/analytics/utilization.json?since=2030-01-07&until=2030-01-14").get_json()
+    assert data["hours"] == 168
+    assert client.get("/analytics/utilization?since=2030-01-14&until=2030-01-07").status_code == 400
@@ -139,3 +139,215 @@ def test_audit_log_page_shows_entries_and_is_admin_only(client):
     assert "admin@example.com" in text
     assert "Forced single booking" in text
     assert "2025-06-05 09:00:00" in text
+
+def test_booking_actions_record_structured_fields(client):
+    from app.bookings.service import BookingService
+    with client.application.app_context():
+        user = User.query.filter_by(email="regular@example.com").first()
+        env = db.session.get(Environment, 1)
+        start = datetime(2030, 1, 7, 9, 0)
+        ok, b = BookingService.attempt_single_booking(user, env, start, start + timedelta(hours=1))
+        assert ok
+        BookingService.attempt_edit_booking(b, user, env, start + timedelta(hours=2), start + timedelta(hours=3))
+
+        created, edited = AuditLog.query.filter_by(booking_id=b.id).order_by(AuditLog.id).all()
+        assert (created.action, created.environment_id, created.start, created.forced) == (
+            "create_booking", env.id, start, False)
+        assert created.details is None
+        assert created.message == "Created booking #1 in env “Sandbox1” from 2030-01-07 09:00 to 2030-01-07 10:00"
+        assert edited.message == ("Edited booking #1 in env “Sandbox1” to 2030-01-07 11:00–2030-01-07 12:00 "
+                                  "(previously 2030-01-07 09:00–2030-01-07 10:00)")
+
+        # the entry keeps the name the environment had at the time
+        env.name = "Renamed"
+        db.session.commit()
+        assert created.environment_name == "Sandbox1"
+        assert "“Sandbox1”" in created.message
+
+
+def test_booking_entry_without_times_falls_back_to_details(client):
+    with client.application.app_context():
+        entry = AuditLog(action="create_booking", actor_id=1, booking_id=3,
+                         environment_id=1, details="Created booking #3 in env “Gone”")
+        db.session.add(entry)
+        db.session.commit()
+        assert entry.message == "Created booking #3 in env “Gone”"
+
+
+def test_backfill_audit_parses_legacy_details(client):
+    legacy = [
+        ("forced_single_book", "Forced booking #12 in env “Sandbox1” from 2025-06-01 09:00 to 2025-06-01 10:00"),
+        ("edit_booking", "Edited booking #12 in env “Sandbox1” – from 2025-06-01 09:00–2025-06-01 10:00 "
+                         "to 2025-06-02 09:00–2025-06-02 10:00"),
+        ("delete_environment", "Deleted environment “Old” (ID 7) by user admin@example.com"),
+    ]
+    with client.application.app_context():
+        for action, details in legacy:
+            db.session.add(AuditLog(action=action, actor_id=1, details=details))
+        db.session.commit()
+
+    result = client.application.test_cli_runner().invoke(args=["backfill-audit"])
+    assert "Backfilled 3 audit entries." in result.output
+
+    with client.application.app_context():
+        forced, edit, env_delete = AuditLog.query.order_by(AuditLog.id).all()
+        assert (forced.booking_id, forced.environment_id, forced.forced, forced.details) == (12, 1, True, None)
+        assert forced.message == legacy[0][1]
+        assert (edit.start, edit.details) == (datetime(2025, 6, 2, 9, 0), "previously 2025-06-01 09:00–2025-06-01 10:00")
+        assert env_delete.environment_id == 7
+        assert env_delete.message == legacy[2][1]
+
+def test_audit_keyset_pages_and_json_api(client):
+    with client.application.app_context():
+        regular = User.query.filter_by(email="regular@example.com").first()
+        base = datetime(2030, 1, 1, 9, 0)
+        for i in range(5):
+            action = "create_booking" if i % 2 == 0 else "delete_booking"
+            db.session.add(AuditLog(action=action, actor_id=regular.id, details=f"entry {i}",
+                                    timestamp=base + timedelta(minutes=i // 2)))
+        db.session.commit()
+
+    login(client, "regular@example.com", "Password123!")
+    seen, url = [], "/audit/api?limit=2"
+    while url:
+        data = client.get(url).get_json()
+        assert len(data["entries"]) <= 2
+        seen += [e["message"] for e in data["entries"]]
+        url = data["next"]
+    assert seen == ["entry 4", "entry 3", "entry 2", "entry 1", "entry 0"]
+
+    data = client.get("/audit/api?action=delete_booking").get_json()
+    assert [e["label"] for e in data["entries"]] == ["Deleted booking", "Deleted booking"]
+    assert client.get("/audit/api?cursor=bogus").status_code == 400
+
+    resp = client.get("/audit/?limit=2")
+    assert b"Older" in resp.data and b"entry 4" in resp.data and b"entry 2" not in resp.data
+
+def test_audit_export_streams_csv_and_gzipped_ndjson(client, tmp_path):
+    import csv
+    import gzip
+    import io
+    import json
+    with client.application.app_context():
+        for i in range(3):
+            db.session.add(AuditLog(action="create_environment", actor_id=1 + i % 2,
+                                    details=f"entry {i}", timestamp=datetime(2030, 1, 1, 9, i)))
+        db.session.commit()
+
+    login(client, "regular@example.com", "Password123!")
+    assert client.get("/audit/export").status_code == 403
+    client.get("/auth/logout")
+
+    login(client, "admin@example.com", "AdminPass123!")
+    resp = client.get("/audit/export?format=csv&since=2030-01-01T09:01")
+    assert resp.is_streamed
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [r["details"] for r in rows] == ["entry 1", "entry 2"]
+    assert rows[0]["actor_email"] == "admin@example.com"
+
+    resp = client.get("/audit/export?format=ndjson&gzip=1&actor=1")
+    lines = gzip.decompress(resp.data).decode().splitlines()
+    assert [json.loads(line)["details"] for line in lines] == ["entry 0", "entry 2"]
+
+    out = tmp_path / "audit.ndjson"
+    result = client.application.test_cli_runner().invoke(
+        args=["export-audit", "--format", "ndjson", "--action", "create_environment", "-o", str(out)])
+    assert result.exit_code == 0
+    assert len(out.read_text().splitlines()) == 3
+
+def test_archive_moves_old_entries_and_export_can_include_them(client, tmp_path):
+    import json
+    from app.audit import retention
+    archive_dir = tmp_path / "archive"
+    client.application.config["AUDIT_ARCHIVE_DIR"] = str(archive_dir)
+    with client.application.app_context():
+        for i, ts in enumerate([datetime(2029, 11, 30), datetime(2029, 12, 1),
+                                datetime(2029, 12, 2), datetime(2030, 6, 1)]):
+            db.session.add(AuditLog(action="create_environment", actor_id=2,
+                                    details=f"entry {i}", timestamp=ts))
+        db.session.commit()
+
+        moved = retention.archive_old_entries(str(archive_dir), max_age_days=30,
+                                              batch_size=2, now=datetime(2030, 6, 2))
+        assert moved == 3
+        assert [e.details for e in AuditLog.query.all()] == ["entry 3"]
+        # the per-batch parts are compacted into one file per month
+        assert sorted(p.name for p in archive_dir.iterdir()) == [
+            "audit-2029-11.ndjson.gz", "audit-2029-12.ndjson.gz"]
+
+        found = list(retention.search_archives(str(archive_dir), since=datetime(2029, 12, 1)))
+        assert [e["details"] for e in found] == ["entry 1", "entry 2"]
+
+    login(client, "admin@example.com", "AdminPass123!")
+    resp = client.get("/audit/export?format=ndjson&archived=1")
+    assert [json.loads(line)["details"] for line in resp.get_data(as_text=True).splitlines()] == [
+        "entry 0", "entry 1", "entry 2", "entry 3"]
+    resp = client.get("/audit/export?format=ndjson")
+    assert len(resp.get_data(as_text=True).splitlines()) == 1
+
+
+def test_later_runs_append_to_the_month_and_leftover_parts_are_compacted(client, tmp_path):
+    from app.audit import retention
+    with client.application.app_context():
+        for day in (1, 2, 3):
+            db.session.add(AuditLog(action="create_environment", actor_id=2,
+                                    details=f"day {day}", timestamp=datetime(2000, 1, day)))
+            db.session.commit()
+            retention.archive_old_entries(str(tmp_path), 30)
+        assert [p.name for p in tmp_path.iterdir()] == ["audit-2000-01.ndjson.gz"]
+
+        # a part left behind by a run interrupted before compaction
+        retention._write_part(retention._part_path(str(tmp_path), "2000-01", 99),
+                              [{**next(retention.search_archives(str(tmp_path))),
+                                "id": 99, "details": "day 4"}])
+        found = [e["details"] for e in retention.search_archives(str(tmp_path))]
+        assert found == ["day 1", "day 2", "day 3", "day 4"]
+        assert retention.compact_archives(str(tmp_path)) == ["2000-01"]
+        assert [p.name for p in tmp_path.iterdir()] == ["audit-2000-01.ndjson.gz"]
+        assert [e["details"] for e in retention.search_archives(str(tmp_path))] == found
+
+
+def test_retention_runs_only_under_the_job_lease(client, tmp_path, monkeypatch):
+    from app import leases
+    from app.audit import retention
+    with client.application.app_context():
+        db.session.add(AuditLog(action="create_environment", actor_id=2,
+                                details="old", timestamp=datetime(2000, 1, 1)))
+        db.session.commit()
+
+        monkeypatch.setattr(leases, "holder", lambda: "other-worker")
+        assert leases.acquire(retention.LEASE_NAME, timedelta(hours=1))
+        monkeypatch.setattr(leases, "holder", lambda: "this-worker")
+        assert retention.run_retention(str(tmp_path), 30) is None
+        assert not leases.renew(retention.LEASE_NAME, timedelta(hours=1))
+        assert AuditLog.query.count() == 1
+
+        # an expired lease is taken over
+        assert leases.acquire(retention.LEASE_NAME, timedelta(hours=1),
+                              now=datetime.utcnow() + timedelta(hours=2))
+        leases.release(retention.LEASE_NAME)
+        assert retention.run_retention(str(tmp_path), 30) == 1
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_forked_workers_hold_leases_separately(client, monkeypatch):
+    from app import leases
+    with client.application.app_context():
+        assert leases.acquire("job", timedelta(hours=1))
+        assert leases.acquire("job", timedelta(hours=1))  # re-entrant for its holder
+        monkeypatch.setattr(leases.os, "getpid", lambda: -1)  # a sibling fork
+        assert not leases.acquire("job", timedelta(hours=1))
+        assert not leases.renew("job", timedelta(hours=1))
+
+
+def test_archiving_stops_when_the_lease_is_lost(client, tmp_path):
+    from app.audit import retention
+    with client.application.app_context():
+        for day in (1, 2, 3):
+            db.session.add(AuditLog(action="create_environment", actor_id=2,
+                                    details="old", timestamp=datetime(2000, 1, day)))
+        db.session.commit()
+        renewals = iter([True, False])
+        moved = retention.archive_old_entries(str(tmp_path), 30, batch_size=2,
+                                              keep_going=lambda: next(renewals))
+        assert moved == 2 and AuditLog.query.count() == 1
@@ -0,0 +1,62 @@
+import time
+from app import db
+from app.models import AuditLog
+from app.audit.service import AuditService
+from app.audit.sink import AuditSink
+
+
+def test_sink_batches_and_flushes_on_close(client, monkeypatch):
+    app = client.application
+    sink = AuditSink(app, batch_size=1000, flush_interval=60)
+    monkeypatch.setitem(app.extensions, "audit_sink", sink)
+    with app.app_context():
+        for i in range(5):
+            AuditService.record("create_booking", 1, details=f"entry {i}", commit=False)
+        db.session.commit()
+        assert AuditLog.query.count() == 0  # nothing on the request path
+
+        sink.close()
+        assert [a.details for a in AuditLog.query.order_by(AuditLog.id)] == [f"entry {i}" for i in range(5)]
+
+
+def test_sink_flushes_when_batch_is_full(client):
+    app = client.application
+    sink = AuditSink(app, batch_size=3, flush_interval=60)
+    try:
+        with app.app_context():
+            for i in range(3):
+                sink.submit(AuditService._row("create_booking", 1, f"entry {i}"))
+            deadline = time.time() + 2
+            while AuditLog.query.count() < 3 and time.time() < deadline:
+                db.session.rollback()
+                time.sleep(0.01)
+            assert AuditLog.query.count() == 3
+    finally:
+        sink.close()
+
+
+def test_rolled_back_entries_never_reach_the_sink(client, monkeypatch):
+    app = client.application
+    sink = AuditSink(app, batch_size=1000, flush_interval=60)
+    monkeypatch.setitem(app.extensions, "audit_sink", sink)
+    with app.app_context():
+        AuditService.record("create_booking", 1, details="rolled back", commit=False)
+        db.session.rollback()
+        AuditService.record("create_booking", 1, details="kept")
+        sink.close()
+        assert [a.details for a in AuditLog.query] == ["kept"]
+
+
+def test_full_queue_falls_back_to_the_current_transaction(client, monkeypatch):
+    app = client.application
+    sink = AuditSink(app, batch_size=1000, flush_interval=60, max_queue=1)
+    monkeypatch.setitem(app.extensions, "audit_sink", sink)
+    try:
+        with app.app_context():
+            sink.submit(AuditService._row("create_booking", 1, "queued"))
+            AuditService.record("create_booking", 1, details="inline", commit=False)
+            assert [a.details for a in AuditLog.query] == ["inline"]  # same transaction
+            db.session.rollback()
+            assert AuditLog.query.count() == 0
+    finally:
+        sink.close()
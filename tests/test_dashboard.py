@@ -0,0 +1,53 @@
+import pytest
+from datetime import datetime, time, timedelta
+from app import db
+from app.main.stats import StatsCache, compute_stats
+from app.models import Booking, User
+from tests.utils import login_user, login_admin, logout_user, future_datetime, post_single_booking
+
+
+@pytest.fixture
+def cache(client, monkeypatch):
+    cache = StatsCache(ttl=60)
+    monkeypatch.setitem(client.application.extensions, "dashboard_cache", cache)
+    return cache
+
+
+def test_dashboard_is_cached_until_a_booking_changes(client, cache):
+    resp = login_user(client)  # lands on the dashboard
+    assert b"No upcoming bookings" in resp.data
+    client.get("/dashboard")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    start, end = future_datetime()
+    post_single_booking(client, 1, start, end)
+    resp = client.get("/dashboard")
+    assert b"Env1" in resp.data and b"No upcoming bookings" not in resp.data
+    assert cache.misses == 2
+
+
+def test_environment_change_invalidates_every_entry(client, cache):
+    login_admin(client)
+    client.post("/environments/1/edit",
+                data={"name": "Renamed", "owner_squad": "team 1"}, follow_redirects=True)
+    client.get("/dashboard")
+    assert cache.misses == 2
+
+    data = client.get("/dashboard/cache").get_json()
+    assert data["hits"] == 0 and data["misses"] == 2 and data["invalidations"] >= 1
+    logout_user(client)
+    login_user(client)
+    assert client.get("/dashboard/cache").status_code == 403
+
+
+def test_hours_today_are_clipped_to_today_for_users_and_admins(client):
+    with client.application.app_context():
+        midnight = datetime.combine(datetime.utcnow().date(), time.min)
+        for start, hours in ((midnight - timedelta(hours=1), 2),       # 1h today
+                             (midnight + timedelta(hours=22), 4)):     # 2h today
+            db.session.add(Booking(environment_id=1, user_id=1, start=start,
+                                   end=start + timedelta(hours=hours)))
+        db.session.commit()
+
+        assert compute_stats(db.session.get(User, 1))["hours_today"] == 3.0
+        assert compute_stats(db.session.get(User, 2))["hours_today"] == 3.0
@@ -82,3 +82,61 @@ def test_delete_environment_success(client):
     resp = client.post(f"/environments/{env.id}/delete", follow_redirects=True)
     assert b"Environment \'ToDelete\' deleted." in resp.data
     assert Environment.query.filter_by(name="ToDelete").first() is None
+
+
+def test_catalog_reloads_only_when_the_version_moves(client, monkeypatch):
+    from app.environment.catalog import CATALOG_KEY, EnvironmentCatalog
+    from app.versions import current_version
+    catalog = EnvironmentCatalog()
+    monkeypatch.setitem(client.application.extensions, "environment_catalog", catalog)
+    login_admin(client)
+
+    client.get("/bookings/new")
+    client.get("/environments/")
+    assert catalog.reloads == 1
+    version = current_version(CATALOG_KEY)
+
+    resp = client.post("/environments/new",
+                       data={"name": "Alpha", "owner_squad": "Team A"}, follow_redirects=True)
+    assert current_version(CATALOG_KEY) == version + 1
+    assert catalog.reloads == 2
+    assert b"Team A" in resp.data
+    assert b"Alpha" in client.get("/bookings/new").data
+    assert catalog.reloads == 2
+
+
+
+def test_environment_list_reads_the_feed_secret_once(client, monkeypatch):
+    from app import db
+    from app.monitoring.diagnostics import QueryDiagnostics
+    diag = QueryDiagnostics(slow_ms=1e9, n_plus_one=3)
+    monkeypatch.setitem(client.application.extensions, "query_diagnostics", diag)
+    with client.application.app_context():
+        for i in range(5):
+            db.session.add(Environment(name=f"Feed{i}", owner_squad="team 1",
+                                       created_by_email="admin@example.com"))
+        db.session.commit()
+    login_admin(client)
+    page = client.get("/environments/").get_data(as_text=True)
+    assert page.count("/bookings/feed/") == 6
+    assert not [v for v in diag.violations if v.kind == "n+1"]
+
+def test_bump_version_survives_losing_the_insert_race(client, monkeypatch):
+    from app import db, versions
+    with client.application.app_context():
+        versions.bump_version(db.session.connection(), "race")
+        db.session.commit()
+
+        # the first UPDATE misses, as if the row was created right after it ran
+        real_increment = versions._increment
+        calls = []
+
+        def increment(connection, name):
+            calls.append(name)
+            return real_increment(connection, name) if len(calls) > 1 else 0
+
+        monkeypatch.setattr(versions, "_increment", increment)
+        versions.bump_version(db.session.connection(), "race")
+        db.session.commit()
+        assert calls == ["race", "race"]
+        assert versions.current_version("race") == 2
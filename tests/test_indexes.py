@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from app import db
+from app.indexes import ensure_indexes, explain_hot_queries
+
+
+def test_ensure_indexes_creates_missing_ones(client):
+    with client.application.app_context():
+        db.session.execute(text("DROP INDEX ix_bookings_env_start_end"))
+        db.session.commit()
+        assert ensure_indexes() == ["ix_bookings_env_start_end"]
+        assert ensure_indexes() == []
+
+
+def test_hot_queries_use_the_indexes(client):
+    with client.application.app_context():
+        plans = {label: " ".join(str(v) for row in plan for v in row)
+                 for label, plan in explain_hot_queries()}
+    assert "ix_bookings_env_start_end" in plans["overlap check"]
+    assert "ix_bookings_user_start" in plans["my upcoming bookings"]
+    assert "ix_bookings_start" in plans["all upcoming bookings"]
+    assert "ix_audit_log_actor_timestamp_id" in plans["my activity"]
+    assert "ix_audit_log_timestamp" in plans["recent activity"]
@@ -0,0 +1,44 @@
+import re
+import pytest
+from app.monitoring.metrics import Histogram, Metrics
+from tests.utils import login_user, login_admin, logout_user
+
+
+@pytest.fixture
+def registry(client, monkeypatch):
+    registry = Metrics()
+    monkeypatch.setitem(client.application.extensions, "metrics", registry)
+    return registry
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram((1, 5))
+    for value in (0.5, 1, 3, 7):
+        hist.observe(value)
+    assert list(hist.cumulative()) == [(1, 2), (5, 3), ("+Inf", 4)]
+    assert (hist.sum, hist.count) == (11.5, 4)
+
+
+def test_metrics_record_latency_status_and_queries(client, registry):
+    login_admin(client)
+    client.get("/environments/")
+    client.get("/no-such-page")
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_requests_total{endpoint="environment.list_environments",method="GET",status="200"} 1' in text
+    assert 'http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{endpoint="environment.list_environments"} 1' in text
+    queries = re.search(r'db_queries_per_request_sum\{endpoint="environment.list_environments"\} (\S+)', text)
+    assert float(queries.group(1)) >= 1
+
+
+def test_metrics_require_admin_or_token(client, registry, monkeypatch):
+    assert client.get("/metrics").status_code == 403
+    login_user(client)
+    assert client.get("/metrics").status_code == 403
+    logout_user(client)
+
+    monkeypatch.setitem(client.application.config, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    resp = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert resp.status_code == 200 and resp.mimetype == "text/plain"
@@ -0,0 +1,61 @@
+import os
+import pstats
+import pytest
+from app.monitoring import profiler
+from tests.utils import login_user, login_admin, logout_user
+
+
+@pytest.fixture
+def profile_dir(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.application.config, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _token(client, user_id):
+    with client.application.test_request_context():
+        return profiler.profile_token(user_id)
+
+
+def test_admin_token_profiles_one_request(client, profile_dir):
+    login_admin(client)
+    assert client.get("/dashboard").headers.get("X-Profile-Name") is None
+
+    resp = client.get(f"/dashboard?_profile={_token(client, 2)}")
+    name = resp.headers["X-Profile-Name"]
+    assert resp.status_code == 200 and name.endswith("-main.dashboard")
+    summary = (profile_dir / f"{name}.txt").read_text()
+    assert "GET /dashboard" in summary and "Call tree" in summary and "dashboard" in summary
+    pstats.Stats(str(profile_dir / f"{name}.prof"))  # loadable
+
+    resp = client.get("/bookings/", headers={"X-Profile": _token(client, 2)})
+    assert resp.headers["X-Profile-Name"].endswith("-bookings.list_bookings")
+
+    page = client.get("/profiles/").get_data(as_text=True)
+    assert name in page
+    assert client.get(f"/profiles/{name}").status_code == 200
+    assert client.get(f"/profiles/{name}.prof").status_code == 200
+    assert client.get("/profiles/..%2Fconfig").status_code == 404
+
+
+def test_profile_token_is_bound_to_its_admin(client, profile_dir):
+    login_user(client)
+    assert client.get("/profiles/").status_code == 403
+    resp = client.get(f"/dashboard?_profile={_token(client, 1)}")
+    assert "X-Profile-Name" not in resp.headers
+    logout_user(client)
+
+    login_admin(client)
+    for token in (_token(client, 1), "garbage"):
+        assert "X-Profile-Name" not in client.get(f"/dashboard?_profile={token}").headers
+    assert os.listdir(profile_dir) == []
+
+
+def test_old_profiles_are_rotated(client, profile_dir, monkeypatch):
+    monkeypatch.setitem(client.application.config, "PROFILE_KEEP", 2)
+    login_admin(client)
+    token = _token(client, 2)
+    names = [client.get(f"/dashboard?_profile={token}").headers["X-Profile-Name"]
+             for _ in range(3)]
+    with client.application.test_request_context():
+        assert profiler.list_profiles() == names[:0:-1]
+    assert len(os.listdir(profile_dir)) == 4
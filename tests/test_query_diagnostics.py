@@ -0,0 +1,40 @@
+import pytest
+from flask import Response
+from sqlalchemy import select
+from app import db
+from app.models import User
+from app.monitoring import diagnostics
+from app.monitoring.diagnostics import QueryDiagnostics, statement_shape
+
+
+@pytest.fixture
+def diag(client, monkeypatch):
+    diag = QueryDiagnostics(slow_ms=0, n_plus_one=3)
+    monkeypatch.setitem(client.application.extensions, "query_diagnostics", diag)
+    return diag
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT x FROM t WHERE id IN (?, ?, ?)") == \
+        statement_shape("SELECT x\n FROM t WHERE id IN (?, ?)")
+
+
+def test_repeated_statement_shape_is_flagged(client, diag):
+    app = client.application
+    with app.test_request_context("/bookings/"):
+        diagnostics._start_request()
+        for user_id in (1, 2, 1, 2):
+            db.session.execute(select(User.email).where(User.id == user_id)).all()
+        diagnostics._check_request(Response())
+
+    [violation] = diag.violations
+    assert violation.kind == "n+1" and "4 executions" in violation.detail
+    assert "test_query_diagnostics.py" not in violation.origin  # app frames only
+
+
+def test_slow_statements_are_recorded_with_parameters(client, diag):
+    diag.slow_ms = 1e-9
+    with client.application.app_context():
+        db.session.execute(select(User.email).where(User.id == 2)).all()
+    assert diag.violations[0].kind == "slow"
+    assert "(2" in diag.violations[0].detail